@@ -1,14 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from geoalchemy2 import Geography
-from sqlalchemy import cast, func, select
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from geoalchemy2 import Geography, Geometry
+from sqlalchemy import (
+    Float,
+    and_,
+    any_,
+    case,
+    cast,
+    delete,
+    func,
+    literal,
+    null,
+    or_,
+    select,
+    true,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.alert import AlertPreference
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.geometry import point_lat_lon
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.security import Principal, get_current_principal
+from app.models.alert import AlertInboxItem, AlertPreference
 from app.models.incident import Incident
-from app.models.user import User
-from app.schemas.alert import AlertFeedItem, AlertPreferenceCreate, AlertPreferenceResponse
+from app.models.neighborhood import Neighborhood
+from app.schemas.alert import (
+    AlertFeedItem,
+    AlertPreferenceCreate,
+    AlertPreferenceResponse,
+    AlertReadRequest,
+    AlertUnreadCount,
+)
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
@@ -16,19 +44,28 @@ router = APIRouter(prefix="/alerts", tags=["alerts"])
 @router.post("/preferences", response_model=AlertPreferenceResponse, status_code=status.HTTP_201_CREATED)
 async def create_alert_preference(
     body: AlertPreferenceCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     center_geom = None
+    area = None
     if body.center_lat is not None and body.center_lon is not None:
         center_geom = func.ST_SetSRID(func.ST_MakePoint(body.center_lon, body.center_lat), 4326)
+        if body.mode == "radius" and body.radius_km:
+            area = preference_area(center_geom, body.radius_km)
+
+    neighborhood = None
+    if body.mode == "neighborhood":
+        neighborhood = await _resolve_neighborhood(db, body.neighborhood_id, body.neighborhood_name)
 
     pref = AlertPreference(
         user_id=current_user.id,
         mode=body.mode,
-        neighborhood_name=body.neighborhood_name,
+        neighborhood_name=neighborhood.name if neighborhood else body.neighborhood_name,
+        neighborhood_id=neighborhood.id if neighborhood else None,
         center_geom=center_geom,
         radius_km=body.radius_km,
+        area=area,
         types=[t.value for t in body.types] if body.types else None,
         min_severity=body.min_severity.value,
         enabled=body.enabled,
@@ -36,14 +73,16 @@ async def create_alert_preference(
     db.add(pref)
     await db.flush()
     await db.refresh(pref)
+    if pref.enabled:
+        await _backfill_inbox(db, current_user.id, pref.id)
 
-    return await _pref_to_response(db, pref)
+    return _pref_to_response(pref)
 
 
 @router.get("/preferences", response_model=list[AlertPreferenceResponse])
 async def list_alert_preferences(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(AlertPreference)
@@ -51,13 +90,13 @@ async def list_alert_preferences(
         .order_by(AlertPreference.created_at.desc())
     )
     prefs = result.scalars().all()
-    return [await _pref_to_response(db, p) for p in prefs]
+    return [_pref_to_response(p) for p in prefs]
 
 
 @router.delete("/preferences/{pref_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_alert_preference(
     pref_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     pref = await db.get(AlertPreference, pref_id)
@@ -65,111 +104,274 @@ async def delete_alert_preference(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Preference not found")
     await db.delete(pref)
     await db.flush()
+    await _prune_inbox(db, current_user.id)
+
+
+async def _prune_inbox(db: AsyncSession, user_id: int) -> None:
+    """Drop inbox entries that none of the user's remaining enabled preferences match.
+
+    Inbox rows do not record which preference produced them, and several
+    preferences may match the same incident, so each entry is checked
+    against what is left (at most ``ALERT_INBOX_MAX_ITEMS`` rows).
+    """
+    still_matched = (
+        select(AlertPreference.id)
+        .where(
+            AlertPreference.user_id == user_id,
+            AlertPreference.enabled.is_(True),
+            or_(AlertPreference.types.is_(None), Incident.type == any_(AlertPreference.types)),
+            _severity_rank(Incident.severity) >= _severity_rank(AlertPreference.min_severity),
+            or_(
+                and_(
+                    AlertPreference.mode == "radius",
+                    func.ST_DWithin(
+                        cast(Incident.public_geom, Geography),
+                        cast(AlertPreference.center_geom, Geography),
+                        AlertPreference.radius_km * 1000,
+                    ),
+                ),
+                and_(
+                    AlertPreference.mode == "neighborhood",
+                    AlertPreference.neighborhood_id == Incident.neighborhood_id,
+                ),
+            ),
+        )
+        .exists()
+    )
+    await db.execute(
+        delete(AlertInboxItem).where(
+            AlertInboxItem.user_id == user_id,
+            AlertInboxItem.incident_id == Incident.id,
+            ~still_matched,
+        )
+    )
+
+
+async def _resolve_neighborhood(db: AsyncSession, neighborhood_id: int | None, name: str | None) -> Neighborhood:
+    if neighborhood_id is not None:
+        neighborhood = await db.get(Neighborhood, neighborhood_id)
+    elif name:
+        result = await db.execute(
+            select(Neighborhood)
+            .where(func.lower(Neighborhood.name) == name.strip().lower())
+            .order_by(Neighborhood.id)
+            .limit(1)
+        )
+        neighborhood = result.scalar_one_or_none()
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="neighborhood_id or neighborhood_name is required for neighborhood alerts",
+        )
+    if neighborhood is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Neighborhood not found")
+    return neighborhood
+
+
+def preference_area(center_geom, radius_km: float):
+    """Polygon covering a radius preference, indexed for incident matching.
+
+    ST_Buffer returns an inscribed polygon, so the radius is padded by 1%;
+    the matcher still applies the exact ST_DWithin check.
+    """
+    return cast(func.ST_Buffer(cast(center_geom, Geography), radius_km * 1000 * 1.01), Geometry)
+
+
+_SEVERITY_RANK = {"baixa": 1, "media": 2, "alta": 3}
+
+
+def _severity_rank(column):
+    return case(_SEVERITY_RANK, value=column, else_=1)
+
+
+def _enabled_prefs(user_id: int):
+    return select(
+        AlertPreference.center_geom,
+        AlertPreference.radius_km,
+        AlertPreference.neighborhood_id,
+        AlertPreference.types,
+        _severity_rank(AlertPreference.min_severity).label("min_rank"),
+    ).where(
+        AlertPreference.user_id == user_id,
+        AlertPreference.enabled.is_(True),
+    )
+
+
+def _lateral_matches(prefs, match_condition, distance, limit: int, since: datetime, exclude_user_id: int):
+    """Open incidents matching each preference row, newest first, joined LATERAL."""
+    matches = (
+        select(Incident.id, Incident.created_at, distance.label("distance_m"))
+        .where(
+            Incident.status == "open",
+            Incident.created_at >= since,
+            Incident.user_id != exclude_user_id,
+            match_condition,
+            or_(prefs.c.types.is_(None), Incident.type == any_(prefs.c.types)),
+            _severity_rank(Incident.severity) >= prefs.c.min_rank,
+        )
+        .order_by(Incident.created_at.desc(), Incident.id.desc())
+        .limit(limit)
+        .lateral()
+    )
+    return select(matches.c.id, matches.c.created_at, matches.c.distance_m).select_from(prefs).join(matches, true())
+
+
+async def _backfill_inbox(db: AsyncSession, user_id: int, pref_id: int) -> None:
+    """Copy recent open incidents matching a new preference into the user's inbox.
+
+    Incidents created from now on reach the inbox through the matcher task.
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=settings.ALERT_INBOX_BACKFILL_DAYS)
+    prefs = _enabled_prefs(user_id).where(AlertPreference.id == pref_id)
+    radius_prefs = prefs.where(AlertPreference.mode == "radius").subquery("radius_prefs")
+    area_prefs = prefs.where(AlertPreference.mode == "neighborhood").subquery("area_prefs")
+
+    candidates = union_all(
+        _lateral_matches(
+            radius_prefs,
+            func.ST_DWithin(
+                cast(Incident.public_geom, Geography),
+                cast(radius_prefs.c.center_geom, Geography),
+                radius_prefs.c.radius_km * 1000,
+            ),
+            func.ST_Distance(
+                cast(Incident.public_geom, Geography),
+                cast(radius_prefs.c.center_geom, Geography),
+            ),
+            settings.ALERT_INBOX_MAX_ITEMS,
+            since,
+            user_id,
+        ),
+        _lateral_matches(
+            area_prefs,
+            Incident.neighborhood_id == area_prefs.c.neighborhood_id,
+            null().cast(Float),
+            settings.ALERT_INBOX_MAX_ITEMS,
+            since,
+            user_id,
+        ),
+    ).subquery("candidates")
+
+    await db.execute(
+        pg_insert(AlertInboxItem)
+        .from_select(
+            ["user_id", "incident_id", "distance_m", "created_at"],
+            select(literal(user_id), candidates.c.id, candidates.c.distance_m, candidates.c.created_at),
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "incident_id"])
+    )
 
 
 @router.get("/feed", response_model=list[AlertFeedItem])
 async def alert_feed(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    cursor: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    unread_only: bool = Query(False),
+    include_stale: bool = Query(False),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Return recent incidents matching the user's enabled alert preferences."""
-    prefs_result = await db.execute(
-        select(AlertPreference).where(
-            AlertPreference.user_id == current_user.id,
-            AlertPreference.enabled.is_(True),
+    """Return the user's alert inbox, newest first.
+
+    The inbox is filled when incidents are created (see app.tasks.alerts),
+    so this is a single index range read on (user_id, created_at). Pages are
+    keyed on (created_at, incident_id); the next page's cursor is returned in
+    the ``X-Next-Cursor`` header. Incidents that are no longer open are
+    hidden unless ``include_stale`` is set.
+    """
+    query = (
+        select(
+            AlertInboxItem,
+            Incident,
+            func.ST_Y(Incident.public_geom).label("lat"),
+            func.ST_X(Incident.public_geom).label("lon"),
         )
+        .join(Incident, Incident.id == AlertInboxItem.incident_id)
+        .where(AlertInboxItem.user_id == current_user.id)
     )
-    prefs = prefs_result.scalars().all()
-
-    items: list[AlertFeedItem] = []
-    seen_ids: set[int] = set()
+    if not include_stale:
+        query = query.where(AlertInboxItem.stale.is_(False))
+    if unread_only:
+        query = query.where(AlertInboxItem.read_at.is_(None))
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(AlertInboxItem.created_at, AlertInboxItem.incident_id) < tuple_(after_created_at, after_id)
+        )
 
-    severity_order = {"baixa": 1, "media": 2, "alta": 3}
+    rows = (
+        await db.execute(
+            query.order_by(AlertInboxItem.created_at.desc(), AlertInboxItem.incident_id.desc()).limit(limit + 1)
+        )
+    ).all()
 
-    for pref in prefs:
-        if pref.mode == "radius" and pref.center_geom is not None and pref.radius_km:
-            radius_m = pref.radius_km * 1000
-            center_coords = await db.execute(
-                select(
-                    func.ST_Y(pref.center_geom).label("lat"),
-                    func.ST_X(pref.center_geom).label("lon"),
-                )
-            )
-            c = center_coords.one()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.incident_id)
 
-            center_point = func.ST_SetSRID(func.ST_MakePoint(c.lon, c.lat), 4326)
+    return [
+        AlertFeedItem(
+            incident_id=inc.id,
+            type=inc.type,
+            severity=inc.severity,
+            description=inc.description,
+            lat=lat,
+            lon=lon,
+            distance_km=round(item.distance_m / 1000, 2) if item.distance_m is not None else None,
+            neighborhood_id=inc.neighborhood_id,
+            created_at=inc.created_at,
+            read=item.read_at is not None,
+            stale=item.stale,
+        )
+        for item, inc, lat, lon in rows
+    ]
 
-            query = (
-                select(
-                    Incident,
-                    func.ST_Distance(
-                        cast(Incident.public_geom, Geography),
-                        cast(center_point, Geography),
-                    ).label("distance_m"),
-                    func.ST_Y(Incident.public_geom).label("lat"),
-                    func.ST_X(Incident.public_geom).label("lon"),
-                )
-                .where(
-                    Incident.status == "open",
-                    func.ST_DWithin(
-                        cast(Incident.public_geom, Geography),
-                        cast(center_point, Geography),
-                        radius_m,
-                    ),
-                )
-                .order_by(Incident.created_at.desc())
-                .limit(50)
-            )
 
-            if pref.types:
-                query = query.where(Incident.type.in_(pref.types))
-
-            min_sev = severity_order.get(pref.min_severity, 1)
-
-            rows = await db.execute(query)
-            for inc, distance_m, lat, lon in rows.all():
-                if inc.id in seen_ids:
-                    continue
-                inc_sev = severity_order.get(inc.severity, 1)
-                if inc_sev < min_sev:
-                    continue
-                seen_ids.add(inc.id)
-                items.append(
-                    AlertFeedItem(
-                        incident_id=inc.id,
-                        type=inc.type,
-                        severity=inc.severity,
-                        description=inc.description,
-                        lat=lat,
-                        lon=lon,
-                        distance_km=round(distance_m / 1000, 2),
-                        created_at=inc.created_at,
-                    )
-                )
-
-    items.sort(key=lambda x: x.created_at, reverse=True)
-    return items
-
-
-async def _pref_to_response(db: AsyncSession, pref: AlertPreference) -> AlertPreferenceResponse:
-    center_lat: float | None = None
-    center_lon: float | None = None
-    if pref.center_geom is not None:
-        coords = await db.execute(
-            select(
-                func.ST_Y(pref.center_geom).label("lat"),
-                func.ST_X(pref.center_geom).label("lon"),
+@router.get("/feed/unread-count", response_model=AlertUnreadCount)
+async def alert_unread_count(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
+):
+    count = (
+        await db.execute(
+            select(func.count()).where(
+                AlertInboxItem.user_id == current_user.id,
+                AlertInboxItem.read_at.is_(None),
+                AlertInboxItem.stale.is_(False),
             )
         )
-        row = coords.one()
-        center_lat = row.lat
-        center_lon = row.lon
+    ).scalar() or 0
+    return AlertUnreadCount(unread=count)
+
+
+@router.post("/feed/read", response_model=AlertUnreadCount)
+async def mark_alerts_read(
+    body: AlertReadRequest,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Mark the given inbox items (or all of them) as read; returns the remaining unread count."""
+    query = update(AlertInboxItem).where(
+        AlertInboxItem.user_id == current_user.id,
+        AlertInboxItem.read_at.is_(None),
+    )
+    if body.incident_ids is not None:
+        query = query.where(AlertInboxItem.incident_id.in_(body.incident_ids))
+    await db.execute(query.values(read_at=func.now()))
+    await db.flush()
+    return await alert_unread_count(current_user=current_user, db=db)
+
 
+def _pref_to_response(pref: AlertPreference) -> AlertPreferenceResponse:
+    center_lat, center_lon = point_lat_lon(pref.center_geom)
     return AlertPreferenceResponse(
         id=pref.id,
         user_id=pref.user_id,
         mode=pref.mode,
         neighborhood_name=pref.neighborhood_name,
+        neighborhood_id=pref.neighborhood_id,
         center_lat=center_lat,
         center_lon=center_lon,
         radius_km=pref.radius_km,
@@ -10,6 +10,7 @@ from app.core.security import (
     create_refresh_token,
     get_current_user,
     hash_password,
+    is_token_revoked,
     revoke_token,
     verify_password,
     verify_token,
@@ -41,7 +42,7 @@ async def register(body: UserCreate, request: Request, db: AsyncSession = Depend
 
     user = User(
         email=body.email,
-        password_hash=hash_password(body.password),
+        password_hash=await hash_password(body.password),
         name=body.name,
     )
     db.add(user)
@@ -62,7 +63,7 @@ async def login(body: UserLogin, request: Request, db: AsyncSession = Depends(ge
 
     result = await db.execute(select(User).where(User.email == body.email))
     user = result.scalar_one_or_none()
-    if user is None or not verify_password(body.password, user.password_hash):
+    if user is None or not await verify_password(body.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     return _build_tokens(user)
@@ -85,8 +86,10 @@ async def refresh(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
     # Rotative refresh: revoke the old refresh token
     old_jti = payload.get("jti")
     if old_jti:
+        if await is_token_revoked(old_jti, token_type="refresh"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
         ttl = settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
-        await revoke_token(old_jti, ttl)
+        await revoke_token(old_jti, ttl, token_type="refresh")
 
     return _build_tokens(user)
 
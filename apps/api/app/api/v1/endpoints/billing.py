@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.database import get_db, get_read_db
+from app.core.security import Principal, get_current_principal, get_current_user, invalidate_principal
 from app.models.subscription import Subscription
 from app.models.user import User
 from app.schemas.billing import SubscribeRequest, SubscriptionResponse
@@ -52,6 +52,8 @@ async def subscribe(
 
     await db.flush()
     await db.refresh(sub)
+    await db.commit()
+    await invalidate_principal(current_user.id)
 
     return SubscriptionResponse(
         id=sub.id,
@@ -63,8 +65,8 @@ async def subscribe(
 
 @router.get("/subscription", response_model=SubscriptionResponse | None)
 async def get_subscription(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(Subscription)
@@ -114,6 +116,8 @@ async def cancel_subscription(
 
     await db.flush()
     await db.refresh(sub)
+    await db.commit()
+    await invalidate_principal(current_user.id)
 
     return SubscriptionResponse(
         id=sub.id,
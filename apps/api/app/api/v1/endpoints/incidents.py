@@ -1,16 +1,20 @@
+import logging
 from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from geoalchemy2 import Geography
-from sqlalchemy import cast, func, select
+from sqlalchemy import cast, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.geometry import point_lat_lon
 from app.core.geo_privacy import snap_to_grid
 from app.core.rate_limit import rate_limit_by_user
-from app.core.security import get_current_user
+from app.core.security import Principal, get_current_principal, invalidate_principal
+from app.models.alert import AlertInboxItem
 from app.models.incident import Incident, IncidentComment, IncidentVote
+from app.models.neighborhood import Neighborhood
 from app.models.user import User
 from app.schemas.enums import MINIMUM_REPUTATION_FOR_RESTRICTED, RESTRICTED_INCIDENT_TYPES, SENSITIVE_INCIDENT_TYPES
 from app.schemas.incident import (
@@ -21,15 +25,29 @@ from app.schemas.incident import (
     IncidentResponse,
     IncidentVoteCreate,
 )
+from app.tasks.alerts import notify_incident_subscribers
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
 
+def neighborhood_at(point):
+    """Scalar subquery resolving the neighborhood containing ``point`` (GiST lookup)."""
+    return (
+        select(Neighborhood.id)
+        .where(func.ST_Covers(Neighborhood.geom, point))
+        .order_by(Neighborhood.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
 @router.post("", response_model=IncidentResponse, status_code=status.HTTP_201_CREATED)
 async def create_incident(
     body: IncidentCreate,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     # Rate limit per user
@@ -38,6 +56,7 @@ async def create_incident(
         max_requests=settings.INCIDENT_RATE_LIMIT_PER_HOUR,
         window_seconds=3600,
         action="create_incident",
+        request=request,
     )
 
     # Reputation gate for restricted types (tiroteio, assalto)
@@ -86,12 +105,21 @@ async def create_incident(
         photo_url=body.photo_url,
         geom=exact_point,
         public_geom=public_point,
+        neighborhood_id=neighborhood_at(exact_point),
     )
     db.add(incident)
     await db.flush()
     await db.refresh(incident)
+    response = await _incident_to_response(db, incident, current_user.id)
 
-    return await _incident_to_response(db, incident, current_user.id)
+    # Commit before enqueueing so the matcher worker can see the row
+    await db.commit()
+    try:
+        notify_incident_subscribers.delay(incident.id)
+    except Exception:
+        logger.exception("Failed to enqueue subscriber matching for incident %d", incident.id)
+
+    return response
 
 
 @router.get("", response_model=IncidentListResponse)
@@ -103,8 +131,8 @@ async def list_incidents(
     type_filter: str | None = Query(None, alias="type"),
     offset: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     center = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
 
@@ -223,8 +251,8 @@ async def preview_incidents(
     radius_km: float = Query(2, ge=0.1, le=50),
     types: str | None = Query(None),
     min_severity: str | None = Query(None),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Preview count of open incidents in a given area - used by alert creation form."""
     radius_m = radius_km * 1000
@@ -275,8 +303,8 @@ async def preview_incidents(
 @router.get("/{incident_id}", response_model=IncidentResponse)
 async def get_incident(
     incident_id: int,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     incident = await db.get(Incident, incident_id)
     if incident is None:
@@ -288,7 +316,7 @@ async def get_incident(
 async def vote_incident(
     incident_id: int,
     body: IncidentVoteCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     incident = await db.get(Incident, incident_id)
@@ -347,7 +375,15 @@ async def vote_incident(
         pass
 
     db.add(incident)
-    await db.flush()
+    if incident.status != "open":
+        await db.execute(
+            update(AlertInboxItem)
+            .where(AlertInboxItem.incident_id == incident_id, AlertInboxItem.stale.is_(False))
+            .values(stale=True)
+        )
+    await db.commit()
+    if author:
+        await invalidate_principal(author.id)
     return {"detail": "Vote recorded"}
 
 
@@ -355,7 +391,7 @@ async def vote_incident(
 async def add_comment(
     incident_id: int,
     body: IncidentCommentCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     incident = await db.get(Incident, incident_id)
@@ -384,8 +420,8 @@ async def add_comment(
 @router.get("/{incident_id}/comments", response_model=list[IncidentCommentResponse])
 async def list_comments(
     incident_id: int,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(IncidentComment, User.name)
@@ -441,13 +477,7 @@ async def _incident_to_response(
     )
     viewer_vote = viewer_vote_row.scalar_one_or_none()
 
-    coords = await db.execute(
-        select(
-            func.ST_Y(incident.public_geom).label("lat"),
-            func.ST_X(incident.public_geom).label("lon"),
-        )
-    )
-    row = coords.one()
+    lat, lon = point_lat_lon(incident.public_geom)
 
     return IncidentResponse(
         id=incident.id,
@@ -457,8 +487,8 @@ async def _incident_to_response(
         status=incident.status,
         description=incident.description,
         photo_url=incident.photo_url,
-        lat=row.lat,
-        lon=row.lon,
+        lat=lat,
+        lon=lon,
         created_at=incident.created_at,
         expires_at=incident.expires_at,
         confirmations=confirm_count,
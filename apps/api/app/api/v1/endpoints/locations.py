@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from geoalchemy2.functions import ST_X, ST_Y
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.api.v1.endpoints.routes import invalidate_commute_cache
+from app.core.database import get_db, get_read_db
+from app.core.geometry import point_lat_lon
+from app.core.security import Principal, get_current_principal
 from app.models.user_location import UserLocation
+from app.schemas.enums import LocationType
 from app.schemas.location import LocationCreate, LocationResponse, LocationUpdate
 
 router = APIRouter(prefix="/locations", tags=["locations"])
@@ -15,7 +16,7 @@ router = APIRouter(prefix="/locations", tags=["locations"])
 @router.post("", response_model=LocationResponse, status_code=status.HTTP_201_CREATED)
 async def create_location(
     body: LocationCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     point = func.ST_SetSRID(func.ST_MakePoint(body.lon, body.lat), 4326)
@@ -29,14 +30,15 @@ async def create_location(
     db.add(loc)
     await db.flush()
     await db.refresh(loc)
+    await _invalidate_commute_if_needed(db, loc)
 
-    return await _location_to_response(db, loc)
+    return _location_to_response(loc)
 
 
 @router.get("", response_model=list[LocationResponse])
 async def list_locations(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(UserLocation)
@@ -44,14 +46,14 @@ async def list_locations(
         .order_by(UserLocation.created_at.asc())
     )
     locations = result.scalars().all()
-    return [await _location_to_response(db, loc) for loc in locations]
+    return [_location_to_response(loc) for loc in locations]
 
 
 @router.patch("/{location_id}", response_model=LocationResponse)
 async def update_location(
     location_id: int,
     body: LocationUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     loc = await db.get(UserLocation, location_id)
@@ -66,13 +68,15 @@ async def update_location(
     db.add(loc)
     await db.flush()
     await db.refresh(loc)
-    return await _location_to_response(db, loc)
+    if body.lat is not None and body.lon is not None:
+        await _invalidate_commute_if_needed(db, loc)
+    return _location_to_response(loc)
 
 
 @router.delete("/{location_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_location(
     location_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     loc = await db.get(UserLocation, location_id)
@@ -81,22 +85,25 @@ async def delete_location(
 
     await db.delete(loc)
     await db.flush()
+    await _invalidate_commute_if_needed(db, loc)
 
 
-async def _location_to_response(db: AsyncSession, loc: UserLocation) -> LocationResponse:
-    coords = await db.execute(
-        select(
-            func.ST_Y(loc.geom).label("lat"),
-            func.ST_X(loc.geom).label("lon"),
-        )
-    )
-    row = coords.one()
+async def _invalidate_commute_if_needed(db: AsyncSession, loc: UserLocation) -> None:
+    """Commit, then drop precomputed commutes if home or work moved."""
+    if loc.type not in (LocationType.home.value, LocationType.work.value):
+        return
+    await db.commit()
+    await invalidate_commute_cache(loc.user_id)
+
+
+def _location_to_response(loc: UserLocation) -> LocationResponse:
+    lat, lon = point_lat_lon(loc.geom)
     return LocationResponse(
         id=loc.id,
         label=loc.label,
         type=loc.type,
-        lat=row.lat,
-        lon=row.lon,
+        lat=lat,
+        lon=lon,
         is_private=loc.is_private,
         created_at=loc.created_at,
     )
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_read_db
+from app.core.security import Principal, get_current_principal
+from app.models.incident import Incident
+from app.models.neighborhood import Neighborhood
+from app.schemas.neighborhood import NeighborhoodResponse, NeighborhoodStats
+
+router = APIRouter(prefix="/neighborhoods", tags=["neighborhoods"])
+
+
+@router.get("", response_model=list[NeighborhoodResponse])
+async def list_neighborhoods(
+    q: str | None = Query(None, min_length=2, max_length=100),
+    city: str | None = Query(None, max_length=100),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = select(Neighborhood.id, Neighborhood.name, Neighborhood.city)
+    if q:
+        query = query.where(func.lower(Neighborhood.name).contains(q.strip().lower(), autoescape=True))
+    if city is not None:
+        query = query.where(Neighborhood.city == city)
+    rows = await db.execute(query.order_by(Neighborhood.name).limit(limit))
+    return [NeighborhoodResponse(id=r.id, name=r.name, city=r.city) for r in rows.all()]
+
+
+@router.get("/lookup", response_model=NeighborhoodResponse)
+async def lookup_neighborhood(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Return the neighborhood containing a point."""
+    point = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
+    row = (
+        await db.execute(
+            select(Neighborhood.id, Neighborhood.name, Neighborhood.city)
+            .where(func.ST_Covers(Neighborhood.geom, point))
+            .order_by(Neighborhood.id)
+            .limit(1)
+        )
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No neighborhood at this location")
+    return NeighborhoodResponse(id=row.id, name=row.name, city=row.city)
+
+
+@router.get("/{neighborhood_id}/stats", response_model=NeighborhoodStats)
+async def neighborhood_stats(
+    neighborhood_id: int,
+    days: int = Query(30, ge=1, le=365),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Incident counts for a neighborhood over the last ``days`` days."""
+    # Only the name: the polygon is large and not needed here
+    neighborhood = (
+        await db.execute(select(Neighborhood.id, Neighborhood.name).where(Neighborhood.id == neighborhood_id))
+    ).first()
+    if neighborhood is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Neighborhood not found")
+
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rows = await db.execute(
+        select(Incident.type, Incident.severity, Incident.status, func.count())
+        .where(Incident.neighborhood_id == neighborhood_id, Incident.created_at >= since)
+        .group_by(Incident.type, Incident.severity, Incident.status)
+    )
+
+    total = 0
+    open_count = 0
+    by_type: dict[str, int] = {}
+    by_severity: dict[str, int] = {}
+    for inc_type, severity, inc_status, count in rows.all():
+        total += count
+        if inc_status == "open":
+            open_count += count
+        by_type[inc_type] = by_type.get(inc_type, 0) + count
+        by_severity[severity] = by_severity.get(severity, 0) + count
+
+    return NeighborhoodStats(
+        neighborhood_id=neighborhood.id,
+        name=neighborhood.name,
+        days=days,
+        total=total,
+        open=open_count,
+        by_type=by_type,
+        by_severity=by_severity,
+    )
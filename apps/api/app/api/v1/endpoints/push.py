@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.security import Principal, get_current_principal
+from app.models.push_subscription import PushSubscription
+from app.schemas.push import PushSubscriptionCreate, PushSubscriptionResponse, VapidKeyResponse
+
+router = APIRouter(prefix="/push", tags=["push"])
+
+
+@router.get("/vapid-public-key", response_model=VapidKeyResponse)
+async def vapid_public_key():
+    if not settings.VAPID_PUBLIC_KEY:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Push notifications are not configured")
+    return VapidKeyResponse(public_key=settings.VAPID_PUBLIC_KEY)
+
+
+@router.post("/subscriptions", response_model=PushSubscriptionResponse, status_code=status.HTTP_201_CREATED)
+async def subscribe(
+    body: PushSubscriptionCreate,
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Register (or re-register) this device's push endpoint for the current user."""
+    result = await db.execute(select(PushSubscription).where(PushSubscription.endpoint == body.endpoint))
+    sub = result.scalar_one_or_none()
+    if sub is None:
+        sub = PushSubscription(endpoint=body.endpoint)
+        db.add(sub)
+    # Endpoints are per device; a new login on the same browser takes it over
+    sub.user_id = current_user.id
+    sub.p256dh = body.keys.p256dh
+    sub.auth = body.keys.auth
+    sub.user_agent = (request.headers.get("user-agent") or "")[:300] or None
+    await db.flush()
+    await db.refresh(sub)
+    return PushSubscriptionResponse(id=sub.id, endpoint=sub.endpoint, created_at=sub.created_at)
+
+
+@router.get("/subscriptions", response_model=list[PushSubscriptionResponse])
+async def list_subscriptions(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
+):
+    result = await db.execute(
+        select(PushSubscription)
+        .where(PushSubscription.user_id == current_user.id)
+        .order_by(PushSubscription.created_at.desc())
+    )
+    return [
+        PushSubscriptionResponse(id=s.id, endpoint=s.endpoint, created_at=s.created_at)
+        for s in result.scalars().all()
+    ]
+
+
+@router.delete("/subscriptions/{subscription_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def unsubscribe(
+    subscription_id: int,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    sub = await db.get(PushSubscription, subscription_id)
+    if sub is None or sub.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found")
+    await db.delete(sub)
+    await db.flush()
@@ -1,25 +1,46 @@
+import asyncio
+import logging
 import math
+import time
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy import cast, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from geoalchemy2 import Geography
 import httpx
+import numpy as np
 
+from app.core.circuit_breaker import CircuitBreaker
 from app.core.config import settings
+from app.core.corridor import pair_exposure_counts, polyline_exposure, risk_from_counts
 from app.core.database import get_db
-from app.core.redis import cache_get, cache_set
-from app.core.security import get_current_user
+from app.core.polyline import (
+    decode_polyline,
+    encode_polyline,
+    geometry_coords,
+    simplify,
+    zoom_tolerance_m,
+)
+from app.core.rate_limit import rate_limit_by_user
+from app.core.cache import cache_get, cache_get_or_set, invalidate_tags
+from app.core.redis import redis_client
+from app.core.security import Principal, get_current_principal
 from app.models.incident import Incident
-from app.models.user import User
 from app.models.user_location import UserLocation
+from app.schemas.enums import CommuteDirection, GeometryFormat, RouteMode
 from app.schemas.route import (
     CommuteRequest,
     CustomRouteRequest,
     RouteAlternative,
+    RouteMatrixRequest,
+    RouteMatrixResponse,
     RouteResponse,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/routes", tags=["routes"])
 
 ORS_BASE = "https://api.openrouteservice.org/v2/directions"
@@ -28,46 +49,104 @@ ORS_BASE = "https://api.openrouteservice.org/v2/directions"
 @router.post("/commute", response_model=RouteAlternative)
 async def commute_route(
     body: CommuteRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    """Compute a route between the user's saved 'home' and 'work' locations."""
-    home = await _get_user_location(db, current_user.id, "home")
-    work = await _get_user_location(db, current_user.id, "work")
+    """Compute a route between the user's saved 'home' and 'work' locations.
+
+    Routes precomputed by the commute beat job are served straight from cache.
+    """
+    direction = body.direction.value
+    profile = body.profile.value
+    mode = body.mode.value
+
+    await _record_commute_departure(current_user.id, direction, profile, mode)
 
-    if home is None or work is None:
+    cached = await cache_get(commute_cache_key(current_user.id, direction, profile, mode))
+    if cached is not None:
+        return _format_routes(RouteAlternative.model_validate(cached), body.geometry_format, body.zoom)
+
+    result = await compute_commute_route(db, current_user.id, direction, profile, mode)
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Please save both a 'home' and 'work' location first",
         )
-
-    home_coords = await _extract_coords(db, home.geom)
-    work_coords = await _extract_coords(db, work.geom)
-
-    return await _fetch_route(
-        db,
-        origin_lat=home_coords[0],
-        origin_lon=home_coords[1],
-        dest_lat=work_coords[0],
-        dest_lon=work_coords[1],
-        profile=body.profile.value,
-    )
+    return _format_routes(result, body.geometry_format, body.zoom)
 
 
 @router.post("/custom", response_model=RouteAlternative)
 async def custom_route(
     body: CustomRouteRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     """Compute a route between arbitrary origin and destination."""
-    return await _fetch_route(
+    result = await _fetch_route(
         db,
         origin_lat=body.origin_lat,
         origin_lon=body.origin_lon,
         dest_lat=body.dest_lat,
         dest_lon=body.dest_lon,
         profile=body.profile.value,
+        mode=body.mode.value,
+    )
+    return _format_routes(result, body.geometry_format, body.zoom)
+
+
+@router.post("/matrix", response_model=RouteMatrixResponse)
+async def route_matrix(
+    body: RouteMatrixRequest,
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Durations, distances and risk for every origin/destination pair (Business plan).
+
+    Risk is a straight-line approximation: matrix APIs return no route
+    geometry, so each pair is scored on the direct segment between its points.
+    """
+    if current_user.role not in ("business", "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Business plan required for route matrices",
+        )
+
+    await rate_limit_by_user(
+        current_user.id, max_requests=30, window_seconds=3600, action="route_matrix", request=request
+    )
+
+    origins = [(p.lat, p.lon) for p in body.origins]
+    destinations = [(p.lat, p.lon) for p in body.destinations]
+
+    def call_for(provider: str):
+        if provider == "ors":
+            return lambda: _matrix_ors(origins, destinations, body.profile.value)
+        return lambda: _matrix_osrm(
+            origins, destinations, body.profile.value, base_url=_osrm_url(provider)
+        )
+
+    durations, distances = await _call_with_failover(call_for)
+
+    # One spatial query for all pairs, then a chunked vectorised scoring pass
+    # over the straight origin->destination legs
+    # in a worker thread (tens of ms of CPU for a full 50x50 matrix)
+    buffer_m = settings.ROUTE_INCIDENT_BUFFER_M
+    incidents = await _incidents_in_bbox(
+        db, origins + destinations, buffer_m, limit=settings.ROUTE_MATRIX_MAX_INCIDENTS
+    )
+    counts = await asyncio.to_thread(
+        pair_exposure_counts,
+        [(lon, lat) for lat, lon in origins],
+        [(lon, lat) for lat, lon in destinations],
+        [(i["lon"], i["lat"]) for i in incidents],
+        buffer_m,
+    )
+
+    return RouteMatrixResponse(
+        durations=durations,
+        distances=distances,
+        straight_line_risk_scores=risk_from_counts(counts).tolist(),
     )
 
 
@@ -75,25 +154,119 @@ async def custom_route(
 # Helpers
 # ---------------------------------------------------------------------------
 
-async def _get_user_location(db: AsyncSession, user_id: int, loc_type: str) -> UserLocation | None:
-    result = await db.execute(
-        select(UserLocation).where(
-            UserLocation.user_id == user_id,
-            UserLocation.type == loc_type,
-        ).limit(1)
+def _format_routes(
+    result: RouteAlternative,
+    geometry_format: GeometryFormat,
+    zoom: int | None = None,
+) -> RouteAlternative:
+    """Shape compact polyline6 geometries for the response.
+
+    With ``zoom`` the line is Douglas-Peucker simplified to about one pixel.
+    """
+    routes = []
+    for route in result.routes:
+        geometry = route.geometry
+        if geometry:
+            coords = (
+                decode_polyline(geometry, precision=6) if isinstance(geometry, str)
+                else geometry_coords(geometry)
+            )
+            if zoom is not None:
+                coords = simplify(coords, zoom_tolerance_m(zoom, coords[0][1]))
+            if geometry_format == GeometryFormat.polyline6:
+                geometry = encode_polyline(coords, precision=6)
+            else:
+                geometry = {"type": "LineString", "coordinates": coords}
+        routes.append(route.model_copy(update={"geometry": geometry}))
+    return RouteAlternative(routes=routes)
+
+
+def commute_cache_key(user_id: int, direction: str, profile: str, mode: str) -> str:
+    return f"commute:{user_id}:{direction}:{profile}:{mode}"
+
+
+def commute_cache_tag(user_id: int) -> str:
+    """Cache tag on every precomputed commute route of the user."""
+    return f"commute:{user_id}"
+
+
+def commute_slot_key(direction: str, hour: int, day: date) -> str:
+    """Set of user IDs who asked for this commute in this local hour on ``day``."""
+    return f"commute:slot:{direction}:{hour}:{day.isoformat()}"
+
+
+def commute_prefs_key(user_id: int) -> str:
+    """Hash of direction -> "profile|mode" last requested by the user."""
+    return f"commute:prefs:{user_id}"
+
+
+async def invalidate_commute_cache(user_id: int) -> None:
+    """Drop precomputed commute routes, e.g. after home or work changed."""
+    await invalidate_tags(commute_cache_tag(user_id))
+
+
+async def _record_commute_departure(user_id: int, direction: str, profile: str, mode: str) -> None:
+    """Learn the user's typical departure hour for the precompute job.
+
+    Each slot is counted at most once per user per day, and day sets expire
+    after ``COMMUTE_HISTORY_DAYS``, so habits that stop are forgotten.
+    """
+    now = datetime.now(ZoneInfo(settings.APP_TIMEZONE))
+    history = settings.COMMUTE_HISTORY_DAYS * 86400
+    slot_key = commute_slot_key(direction, now.hour, now.date())
+    pipe = redis_client.pipeline()
+    pipe.sadd(slot_key, user_id)
+    pipe.expire(slot_key, history + 86400, nx=True)
+    pipe.hset(commute_prefs_key(user_id), direction, f"{profile}|{mode}")
+    pipe.expire(commute_prefs_key(user_id), history)
+    await pipe.execute()
+
+
+async def compute_commute_route(
+    db: AsyncSession,
+    user_id: int,
+    direction: str,
+    profile: str,
+    mode: str = RouteMode.fastest.value,
+) -> RouteAlternative | None:
+    """Route between saved home and work, or None if either is missing."""
+    coords = await _get_commute_coords(db, user_id)
+    if "home" not in coords or "work" not in coords:
+        return None
+
+    origin, dest = coords["home"], coords["work"]
+    if direction == CommuteDirection.to_home.value:
+        origin, dest = dest, origin
+
+    return await _fetch_route(
+        db,
+        origin_lat=origin[0],
+        origin_lon=origin[1],
+        dest_lat=dest[0],
+        dest_lon=dest[1],
+        profile=profile,
+        mode=mode,
     )
-    return result.scalar_one_or_none()
 
 
-async def _extract_coords(db: AsyncSession, geom) -> tuple[float, float]:
-    coords = await db.execute(
+async def _get_commute_coords(db: AsyncSession, user_id: int) -> dict[str, tuple[float, float]]:
+    """Fetch home and work coordinates in a single query."""
+    rows = await db.execute(
         select(
-            func.ST_Y(geom).label("lat"),
-            func.ST_X(geom).label("lon"),
+            UserLocation.type,
+            func.ST_Y(UserLocation.geom).label("lat"),
+            func.ST_X(UserLocation.geom).label("lon"),
         )
+        .where(
+            UserLocation.user_id == user_id,
+            UserLocation.type.in_(("home", "work")),
+        )
+        .order_by(UserLocation.created_at.asc())
     )
-    row = coords.one()
-    return (row.lat, row.lon)
+    coords: dict[str, tuple[float, float]] = {}
+    for r in rows.all():
+        coords.setdefault(r.type, (r.lat, r.lon))
+    return coords
 
 
 async def _fetch_route(
@@ -103,36 +276,100 @@ async def _fetch_route(
     dest_lat: float,
     dest_lon: float,
     profile: str,
+    mode: str = RouteMode.fastest.value,
 ) -> RouteAlternative:
-    """Call OpenRouteService and enrich with incidents along route."""
-    cache_key = f"route:{profile}:{origin_lat:.5f},{origin_lon:.5f}-{dest_lat:.5f},{dest_lon:.5f}"
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        return RouteAlternative.model_validate(cached)
+    """Call OpenRouteService and enrich with incidents along route.
+
+    Geometries come back (and are cached) as full-resolution polyline6
+    strings; use ``_format_routes`` to shape them for the client.
+
+    One spatial query fetches candidate incidents for the whole detour
+    corridor; each alternative is then scored in memory against its own
+    geometry. In ``safest`` mode high-severity incidents are also turned into
+    avoid polygons and alternatives are ranked by exposure, not duration.
+    """
+    cache_key = f"route:{profile}:{mode}:{origin_lat:.5f},{origin_lon:.5f}-{dest_lat:.5f},{dest_lon:.5f}"
+    # Cached for 2 minutes; concurrent identical requests share one computation
+    cached = await cache_get_or_set(
+        cache_key,
+        lambda: _compute_route(db, origin_lat, origin_lon, dest_lat, dest_lon, profile, mode),
+        ttl=120,
+    )
+    return RouteAlternative.model_validate(cached)
 
-    if settings.OPENROUTESERVICE_API_KEY:
-        result = await _fetch_ors(
-            db, origin_lat, origin_lon, dest_lat, dest_lon, profile
-        )
-    else:
-        # Fallback: free OSRM demo server (no API key needed)
-        result = await _fetch_osrm(
-            db, origin_lat, origin_lon, dest_lat, dest_lon, profile
+
+async def _compute_route(
+    db: AsyncSession,
+    origin_lat: float,
+    origin_lon: float,
+    dest_lat: float,
+    dest_lon: float,
+    profile: str,
+    mode: str,
+) -> dict:
+    safest = mode == RouteMode.safest.value
+
+    # Single spatial query covering every detour an alternative may take
+    dist_km = _haversine_km(origin_lat, origin_lon, dest_lat, dest_lon)
+    buffer_m = int(_detour_offset_km(dist_km) * 1000) + max(
+        settings.ROUTE_INCIDENT_BUFFER_M, settings.ROUTE_AVOID_RADIUS_M
+    )
+    candidates = await _incidents_near_line(
+        db, origin_lat, origin_lon, dest_lat, dest_lon,
+        buffer_m=buffer_m, limit=settings.ROUTE_CORRIDOR_MAX_INCIDENTS,
+    )
+    avoid = _incidents_to_avoid(candidates) if safest else []
+
+    def call_for(provider: str):
+        if provider == "ors":
+            return lambda: _fetch_ors(
+                origin_lat, origin_lon, dest_lat, dest_lon, profile, avoid=avoid,
+            )
+        return lambda: _fetch_osrm(
+            origin_lat, origin_lon, dest_lat, dest_lon, profile,
+            avoid=avoid, base_url=_osrm_url(provider),
         )
 
+    result = _score_routes(await _call_with_failover(call_for), candidates, by_exposure=safest)
+
     if not result.routes:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail="Could not compute route. Try again later.",
         )
 
-    # Cache for 2 minutes
-    await cache_set(cache_key, result.model_dump(), ttl=120)
+    # Compact polyline6 is ~10x smaller than GeoJSON arrays in Redis
+    for route in result.routes:
+        coords = geometry_coords(route.geometry)
+        route.geometry = encode_polyline(coords, precision=6) if coords else None
 
-    return result
+    return result.model_dump()
 
 
-OSRM_BASE = "https://router.project-osrm.org/route/v1"
+# 4xx answers that are about the provider (auth, quota), not about the request
+_PROVIDER_SIDE_4XX = {401, 403, 408, 429}
+
+
+def _provider_error(status_code: int) -> HTTPException:
+    """HTTPException for a non-OK provider response.
+
+    Request errors (an unroutable point, an origin inside an avoid polygon)
+    become 422 and are passed through to the client without counting
+    against the provider's circuit breaker; everything else is a 502.
+    """
+    if 400 <= status_code < 500 and status_code not in _PROVIDER_SIDE_4XX:
+        return HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="No route could be computed between these points.",
+        )
+    return HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail=f"Route service error: {status_code}",
+    )
+
+
+# Free OSRM demo server (no API key needed)
+OSRM_PUBLIC_URL = "https://router.project-osrm.org"
 
 # Map ORS profiles to OSRM profiles
 _OSRM_PROFILE_MAP = {
@@ -142,6 +379,14 @@ _OSRM_PROFILE_MAP = {
 }
 
 
+_SEVERITY_ORDER = {"baixa": 1, "media": 2, "alta": 3}
+
+
+def _detour_offset_km(dist_km: float) -> float:
+    """Perpendicular offset used to force alternatives, scaled to trip length."""
+    return max(0.5, min(dist_km * 0.15, 3.0))
+
+
 def _perpendicular_waypoints(
     lat1: float, lon1: float, lat2: float, lon2: float, offset_km: float = 1.0,
 ) -> list[tuple[float, float]]:
@@ -159,10 +404,18 @@ def _perpendicular_waypoints(
 
 
 async def _osrm_call(
-    client: httpx.AsyncClient, osrm_profile: str, coords_str: str,
+    client: httpx.AsyncClient,
+    base_url: str,
+    osrm_profile: str,
+    coords_str: str,
+    raise_client_errors: bool = False,
 ) -> dict | None:
-    """Single OSRM request, returns parsed JSON or None on failure."""
-    url = f"{OSRM_BASE}/{osrm_profile}/{coords_str}"
+    """Single OSRM request, returns parsed JSON or None on failure.
+
+    With ``raise_client_errors`` an OSRM 4xx (e.g. NoRoute, NoSegment) raises
+    the 422 from ``_provider_error`` instead of returning None.
+    """
+    url = f"{base_url}/route/v1/{osrm_profile}/{coords_str}"
     params = {"overview": "full", "geometries": "geojson", "alternatives": "3"}
     try:
         resp = await client.get(url, params=params)
@@ -171,25 +424,34 @@ async def _osrm_call(
             if data.get("code") == "Ok":
                 return data
     except httpx.RequestError:
-        pass
+        return None
+    if raise_client_errors and resp.status_code != 200:
+        exc = _provider_error(resp.status_code)
+        if exc.status_code < 500:
+            raise exc
     return None
 
 
 async def _fetch_osrm(
-    db: AsyncSession,
     origin_lat: float,
     origin_lon: float,
     dest_lat: float,
     dest_lon: float,
     profile: str,
+    avoid: list[dict] | None = None,
+    base_url: str = OSRM_PUBLIC_URL,
 ) -> RouteAlternative:
-    """Fetch route from free OSRM demo server with forced alternatives."""
+    """Fetch route from an OSRM server with forced alternatives.
+
+    OSRM has no avoid-area support, so when ``avoid`` is given the detour
+    waypoints are tried farthest-from-danger first.
+    """
     osrm_profile = _OSRM_PROFILE_MAP.get(profile, "driving")
     direct_coords = f"{origin_lon},{origin_lat};{dest_lon},{dest_lat}"
 
     transport = httpx.AsyncHTTPTransport(retries=2)
-    async with httpx.AsyncClient(timeout=15, transport=transport) as client:
-        data = await _osrm_call(client, osrm_profile, direct_coords)
+    async with httpx.AsyncClient(timeout=settings.ROUTING_TIMEOUT_SECONDS, transport=transport) as client:
+        data = await _osrm_call(client, base_url, osrm_profile, direct_coords, raise_client_errors=True)
         if data is None:
             raise HTTPException(
                 status_code=status.HTTP_502_BAD_GATEWAY,
@@ -201,10 +463,16 @@ async def _fetch_osrm(
         # If OSRM returned < 3 routes, generate alternatives via offset waypoints
         if len(osrm_routes) < 3:
             dist_km = _haversine_km(origin_lat, origin_lon, dest_lat, dest_lon)
-            offset_km = max(0.5, min(dist_km * 0.15, 3.0))
+            offset_km = _detour_offset_km(dist_km)
             waypoints = _perpendicular_waypoints(
                 origin_lat, origin_lon, dest_lat, dest_lon, offset_km
             )
+            if avoid:
+                waypoints.sort(
+                    key=lambda wp: -min(
+                        _haversine_km(wp[0], wp[1], inc["lat"], inc["lon"]) for inc in avoid
+                    )
+                )
             seen_durations = {int(r.get("duration", 0)) for r in osrm_routes}
 
             for wp_lat, wp_lon in waypoints:
@@ -215,7 +483,7 @@ async def _fetch_osrm(
                     f"{wp_lon},{wp_lat};"
                     f"{dest_lon},{dest_lat}"
                 )
-                via_data = await _osrm_call(client, osrm_profile, via_coords)
+                via_data = await _osrm_call(client, base_url, osrm_profile, via_coords)
                 if via_data and via_data.get("routes"):
                     via_route = via_data["routes"][0]
                     via_dur = int(via_route.get("duration", 0))
@@ -224,21 +492,16 @@ async def _fetch_osrm(
                         osrm_routes.append(via_route)
                         seen_durations.add(via_dur)
 
-    incidents_nearby = await _incidents_near_line(
-        db, origin_lat, origin_lon, dest_lat, dest_lon
-    )
-
+    # Incidents and risk are filled in per route by _score_routes
     routes: list[RouteResponse] = []
     for osrm_route in osrm_routes:
-        inc_count = len(incidents_nearby)
-        risk_score = min(inc_count * 0.15, 1.0)
         routes.append(
             RouteResponse(
                 geometry=osrm_route.get("geometry"),
                 duration_seconds=int(osrm_route.get("duration", 0)),
                 distance_meters=int(osrm_route.get("distance", 0)),
-                incidents_on_route=incidents_nearby,
-                risk_score=round(risk_score, 2),
+                incidents_on_route=[],
+                risk_score=0.0,
             )
         )
 
@@ -257,12 +520,12 @@ def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 
 
 async def _fetch_ors(
-    db: AsyncSession,
     origin_lat: float,
     origin_lon: float,
     dest_lat: float,
     dest_lon: float,
     profile: str,
+    avoid: list[dict] | None = None,
 ) -> RouteAlternative:
     """Fetch route from OpenRouteService (requires API key)."""
     url = f"{ORS_BASE}/{profile}"
@@ -274,9 +537,11 @@ async def _fetch_ors(
         ],
         "alternative_routes": {"target_count": 3},
     }
+    if avoid:
+        payload["options"] = {"avoid_polygons": _avoid_polygons(avoid)}
 
     transport = httpx.AsyncHTTPTransport(retries=2)
-    async with httpx.AsyncClient(timeout=15, transport=transport) as client:
+    async with httpx.AsyncClient(timeout=settings.ROUTING_TIMEOUT_SECONDS, transport=transport) as client:
         try:
             resp = await client.post(url, json=payload, headers=headers)
         except httpx.RequestError as exc:
@@ -286,19 +551,11 @@ async def _fetch_ors(
             ) from exc
 
     if resp.status_code != 200:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Route service error: {resp.status_code}",
-        )
+        raise _provider_error(resp.status_code)
 
     data = resp.json()
     ors_routes = data.get("routes", [])
 
-    incidents_nearby = await _incidents_near_line(
-        db, origin_lat, origin_lon, dest_lat, dest_lon
-    )
-    risk_score = min(len(incidents_nearby) * 0.15, 1.0)
-
     routes: list[RouteResponse] = []
     for ors_route in ors_routes:
         summary = ors_route.get("summary", {})
@@ -307,8 +564,8 @@ async def _fetch_ors(
                 geometry=ors_route.get("geometry"),
                 duration_seconds=int(summary.get("duration", 0)),
                 distance_meters=int(summary.get("distance", 0)),
-                incidents_on_route=incidents_nearby,
-                risk_score=round(risk_score, 2),
+                incidents_on_route=[],
+                risk_score=0.0,
             )
         )
 
@@ -322,8 +579,13 @@ async def _incidents_near_line(
     lat2: float,
     lon2: float,
     buffer_m: int = 200,
+    limit: int = 1000,
 ) -> list[dict]:
-    """Return simplified incident dicts near the straight-line corridor."""
+    """Return simplified incident dicts near the straight-line corridor.
+
+    Nearest to the line first, so beyond ``limit`` (logged) the incidents
+    most likely to be on a route are the ones kept.
+    """
     line = func.ST_SetSRID(
         func.ST_MakeLine(
             func.ST_MakePoint(lon1, lat1),
@@ -348,10 +610,14 @@ async def _incidents_near_line(
                 buffer_m,
             ),
         )
-        .limit(20)
+        .order_by(Incident.public_geom.op("<->")(line), Incident.id)
+        .limit(limit + 1)
     )
 
-    rows = await db.execute(query)
+    rows = (await db.execute(query)).all()
+    if len(rows) > limit:
+        logger.warning("Route corridor query truncated to %d incidents", limit)
+        rows = rows[:limit]
     return [
         {
             "incident_id": r.id,
@@ -360,5 +626,349 @@ async def _incidents_near_line(
             "lat": r.lat,
             "lon": r.lon,
         }
-        for r in rows.all()
+        for r in rows
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Provider failover
+# ---------------------------------------------------------------------------
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+# Timeouts, transport errors, 5xx-style HTTPExceptions and unparseable bodies;
+# HTTPExceptions below 500 are the provider rejecting this particular request
+_UPSTREAM_ERRORS = (HTTPException, httpx.HTTPError, ValueError)
+
+
+def _is_client_error(exc: BaseException) -> bool:
+    return isinstance(exc, HTTPException) and exc.status_code < 500
+
+
+def _routing_providers() -> list[str]:
+    """Configured routing providers, in preference order."""
+    configured = {
+        "ors": bool(settings.OPENROUTESERVICE_API_KEY),
+        "osrm": True,
+        "local": bool(settings.OSRM_LOCAL_URL),
+    }
+    return [p for p in settings.ROUTING_PROVIDERS if configured.get(p)]
+
+
+def _osrm_url(provider: str) -> str:
+    return settings.OSRM_LOCAL_URL.rstrip("/") if provider == "local" else OSRM_PUBLIC_URL
+
+
+def _breaker(provider: str) -> CircuitBreaker:
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(
+            provider,
+            failure_threshold=settings.ROUTING_BREAKER_FAILURES,
+            cooldown_seconds=settings.ROUTING_BREAKER_COOLDOWN_SECONDS,
+        )
+    return _breakers[provider]
+
+
+async def _guarded(provider: str, make_call):
+    """Run one provider call and feed its outcome to the provider's breaker."""
+    breaker = _breaker(provider)
+    start = time.perf_counter()
+    try:
+        result = await make_call()
+        if isinstance(result, RouteAlternative) and not result.routes:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Could not compute route. Try again later.",
+            )
+    except asyncio.CancelledError:
+        # Lost a hedge race: says nothing about the provider's health
+        breaker.record_cancelled()
+        raise
+    except _UPSTREAM_ERRORS as exc:
+        if _is_client_error(exc):
+            # e.g. an unroutable point: says nothing about the provider's health
+            breaker.record_client_error(time.perf_counter() - start)
+        else:
+            breaker.record_failure(time.perf_counter() - start)
+        raise
+    breaker.record_success(time.perf_counter() - start)
+    return result
+
+
+async def _call_with_failover(call_for):
+    """Try providers in order, skipping open circuits.
+
+    ``call_for(provider)`` returns a zero-argument coroutine factory. With
+    hedging enabled, a call still running after the provider's p95 latency is
+    raced against the next healthy provider and the first success wins.
+    """
+    providers = _routing_providers()
+    tried: set[str] = set()
+    last_exc: Exception | None = None
+
+    for provider in providers:
+        if provider in tried:
+            continue
+        breaker = _breaker(provider)
+        if not breaker.allow_request():
+            breaker.record_rejected()
+            continue
+        tried.add(provider)
+
+        hedge_after = (
+            breaker.percentile(0.95, min_samples=settings.ROUTING_HEDGE_MIN_SAMPLES)
+            if settings.ROUTING_HEDGE_ENABLED else None
+        )
+        try:
+            return await _hedged(provider, providers, tried, hedge_after, call_for)
+        except _UPSTREAM_ERRORS as exc:
+            if _is_client_error(exc):
+                raise
+            last_exc = exc
+
+    if last_exc is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Route service temporarily unavailable. Try again later.",
+            headers={"Retry-After": str(settings.ROUTING_BREAKER_COOLDOWN_SECONDS)},
+        )
+    if isinstance(last_exc, HTTPException):
+        raise last_exc
+    raise HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail="Route service unavailable. Try again later.",
+    ) from last_exc
+
+
+async def _hedged(primary: str, providers: list[str], tried: set[str], hedge_after: float | None, call_for):
+    tasks = [asyncio.create_task(_guarded(primary, call_for(primary)))]
+    try:
+        if hedge_after is not None:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                backup = next(
+                    (p for p in providers if p not in tried and _breaker(p).allow_request()),
+                    None,
+                )
+                if backup is not None:
+                    tried.add(backup)
+                    tasks.append(asyncio.create_task(_guarded(backup, call_for(backup))))
+
+        pending = set(tasks)
+        last_exc: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_exc = task.exception()
+        raise last_exc
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+# ---------------------------------------------------------------------------
+# Safest mode
+# ---------------------------------------------------------------------------
+
+def _incidents_to_avoid(incidents: list[dict]) -> list[dict]:
+    """Keep only incidents severe enough to be routed around."""
+    min_sev = _SEVERITY_ORDER.get(settings.ROUTE_AVOID_MIN_SEVERITY, 3)
+    return [i for i in incidents if _SEVERITY_ORDER.get(i["severity"], 1) >= min_sev]
+
+
+def _avoid_polygons(incidents: list[dict], sides: int = 12) -> dict:
+    """Buffer incidents into a GeoJSON MultiPolygon for ORS ``avoid_polygons``."""
+    radius_m = settings.ROUTE_AVOID_RADIUS_M
+    polygons = []
+    for inc in incidents:
+        dlat = radius_m / 111_000
+        dlon = radius_m / (111_000 * math.cos(math.radians(inc["lat"])))
+        ring = [
+            [
+                round(inc["lon"] + dlon * math.cos(2 * math.pi * k / sides), 6),
+                round(inc["lat"] + dlat * math.sin(2 * math.pi * k / sides), 6),
+            ]
+            for k in range(sides)
+        ]
+        ring.append(ring[0])
+        polygons.append([ring])
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def _score_routes(result: RouteAlternative, incidents: list[dict], by_exposure: bool = False) -> RouteAlternative:
+    """Attach the incidents along each alternative's own geometry and its risk.
+
+    Scoring is a vectorised pass over the candidate set already in memory. With
+    ``by_exposure`` routes are ordered by severity-weighted exposure, then by
+    duration.
+    """
+    inc_lonlat = np.array([(i["lon"], i["lat"]) for i in incidents], dtype=float).reshape(-1, 2)
+    weights = np.array([_SEVERITY_ORDER.get(i["severity"], 1) for i in incidents], dtype=float)
+
+    scored = []
+    for route in result.routes:
+        within, per_segment = polyline_exposure(
+            geometry_coords(route.geometry), inc_lonlat,
+            settings.ROUTE_INCIDENT_BUFFER_M, weights=weights,
+        )
+        route.incidents_on_route = [inc for inc, hit in zip(incidents, within) if hit]
+        route.risk_score = round(min(len(route.incidents_on_route) * 0.15, 1.0), 2)
+        scored.append((float(per_segment.sum()), route.duration_seconds, route))
+
+    if by_exposure:
+        scored.sort(key=lambda s: (s[0], s[1]))
+    return RouteAlternative(routes=[route for _, _, route in scored])
+
+
+# ---------------------------------------------------------------------------
+# Matrix
+# ---------------------------------------------------------------------------
+
+ORS_MATRIX_BASE = "https://api.openrouteservice.org/v2/matrix"
+
+# Per-request chunk sizes (origins x destinations) within provider limits
+_ORS_MATRIX_CHUNK = 25
+_OSRM_TABLE_CHUNK = 50
+
+Matrix = list[list[float | None]]
+
+
+def _chunks(items: list, size: int) -> list[tuple[int, list]]:
+    return [(i, items[i:i + size]) for i in range(0, len(items), size)]
+
+
+async def _fill_matrix(
+    origins: list[tuple[float, float]],
+    destinations: list[tuple[float, float]],
+    chunk: int,
+    call,
+) -> tuple[Matrix, Matrix]:
+    """Run ``call`` over origin/destination blocks concurrently and stitch the result."""
+    durations: Matrix = [[None] * len(destinations) for _ in origins]
+    distances: Matrix = [[None] * len(destinations) for _ in origins]
+
+    blocks = [
+        (oi, o_block, di, d_block)
+        for oi, o_block in _chunks(origins, chunk)
+        for di, d_block in _chunks(destinations, chunk)
+    ]
+
+    transport = httpx.AsyncHTTPTransport(retries=2)
+    async with httpx.AsyncClient(timeout=settings.ROUTING_TIMEOUT_SECONDS, transport=transport) as client:
+        results = await asyncio.gather(
+            *(call(client, o_block, d_block) for _, o_block, _, d_block in blocks)
+        )
+
+    for (oi, o_block, di, d_block), (dur, dist) in zip(blocks, results):
+        for r in range(len(o_block)):
+            durations[oi + r][di:di + len(d_block)] = dur[r]
+            distances[oi + r][di:di + len(d_block)] = dist[r]
+    return durations, distances
+
+
+async def _matrix_ors(origins, destinations, profile: str) -> tuple[Matrix, Matrix]:
+    async def call(client: httpx.AsyncClient, o_block, d_block):
+        locations = [[lon, lat] for lat, lon in o_block + d_block]
+        payload = {
+            "locations": locations,
+            "sources": list(range(len(o_block))),
+            "destinations": list(range(len(o_block), len(locations))),
+            "metrics": ["duration", "distance"],
+        }
+        try:
+            resp = await client.post(
+                f"{ORS_MATRIX_BASE}/{profile}",
+                json=payload,
+                headers={"Authorization": settings.OPENROUTESERVICE_API_KEY},
+            )
+        except httpx.RequestError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Route service unavailable. Try again later.",
+            ) from exc
+        if resp.status_code != 200:
+            raise _provider_error(resp.status_code)
+        data = resp.json()
+        return data.get("durations", []), data.get("distances", [])
+
+    return await _fill_matrix(origins, destinations, _ORS_MATRIX_CHUNK, call)
+
+
+async def _matrix_osrm(
+    origins, destinations, profile: str, base_url: str = OSRM_PUBLIC_URL,
+) -> tuple[Matrix, Matrix]:
+    osrm_profile = _OSRM_PROFILE_MAP.get(profile, "driving")
+
+    async def call(client: httpx.AsyncClient, o_block, d_block):
+        coords = ";".join(f"{lon},{lat}" for lat, lon in o_block + d_block)
+        params = {
+            "sources": ";".join(str(i) for i in range(len(o_block))),
+            "destinations": ";".join(str(i) for i in range(len(o_block), len(o_block) + len(d_block))),
+            "annotations": "duration,distance",
+        }
+        try:
+            resp = await client.get(f"{base_url}/table/v1/{osrm_profile}/{coords}", params=params)
+        except httpx.RequestError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Route service unavailable. Try again later.",
+            ) from exc
+        if resp.status_code != 200:
+            raise _provider_error(resp.status_code)
+        data = resp.json()
+        if data.get("code") != "Ok":
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Route service error: {data.get('code')}",
+            )
+        return data.get("durations", []), data.get("distances", [])
+
+    return await _fill_matrix(origins, destinations, _OSRM_TABLE_CHUNK, call)
+
+
+async def _incidents_in_bbox(
+    db: AsyncSession,
+    points: list[tuple[float, float]],
+    buffer_m: int,
+    limit: int = 5000,
+) -> list[dict]:
+    """Open incidents inside the bounding box of ``points``, padded by ``buffer_m``.
+
+    Beyond ``limit`` the incidents nearest the box centre are kept and a
+    warning is logged.
+    """
+    lats = [lat for lat, _ in points]
+    lons = [lon for _, lon in points]
+    pad_lat = buffer_m / 111_000
+    pad_lon = buffer_m / (111_000 * math.cos(math.radians(max(abs(min(lats)), abs(max(lats))))))
+    envelope = func.ST_MakeEnvelope(
+        min(lons) - pad_lon, min(lats) - pad_lat,
+        max(lons) + pad_lon, max(lats) + pad_lat,
+        4326,
+    )
+
+    rows = await db.execute(
+        select(
+            Incident.id,
+            Incident.severity,
+            func.ST_Y(Incident.public_geom).label("lat"),
+            func.ST_X(Incident.public_geom).label("lon"),
+        )
+        .where(
+            Incident.status == "open",
+            Incident.public_geom.op("&&")(envelope),
+        )
+        .order_by(Incident.public_geom.op("<->")(func.ST_Centroid(envelope)), Incident.id)
+        .limit(limit + 1)
+    )
+    rows = rows.all()
+    if len(rows) > limit:
+        logger.warning("Incident bbox query truncated to %d incidents", limit)
+        rows = rows[:limit]
+    return [
+        {"incident_id": r.id, "severity": r.severity, "lat": r.lat, "lon": r.lon}
+        for r in rows
     ]
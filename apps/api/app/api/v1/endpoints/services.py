@@ -1,25 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from urllib.parse import quote, urlencode
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import RedirectResponse
 from geoalchemy2 import Geography
-from sqlalchemy import cast, func, select
+from sqlalchemy import case, cast, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.cache import cache_get_or_set, invalidate_tags
+from app.core.geometry import point_lat_lon
+from app.core.pagination import decode_cursor, encode_cursor
 from app.core.rate_limit import rate_limit_by_user
-from app.core.security import get_admin_user, get_current_user
+from app.core.security import Principal, get_admin_user, get_current_principal
 from app.models.service import Service
-from app.models.user import User
-from app.schemas.service import ServiceCreate, ServiceListResponse, ServiceResponse, ServiceUpdate
+from app.schemas.enums import ServiceSort
+from app.schemas.service import (
+    ServiceCreate,
+    ServiceListResponse,
+    ServiceModerationRequest,
+    ServiceModerationResponse,
+    ServiceResponse,
+    ServiceUpdate,
+)
 
 router = APIRouter(prefix="/services", tags=["services"])
 
 # Plan limits for service listings
 _PLAN_SERVICE_LIMITS = {"pro": 1, "business": 5, "admin": 999}
 
+# Text search configuration created in migration f1c6a8e3b940
+_TS_CONFIG = "pt_unaccent"
+# Search score multiplier for business plan listings
+_BUSINESS_BOOST = 1.5
+_DEFAULT_RADIUS_M = 2000
+_DEFAULT_LIMIT = 50
+
+# Public directory caching: every cached list and item is tagged "services"
+# and dropped on any moderation or owner change. Cache fills read the
+# primary (get_db): a lagging replica could refill the cache with rows from
+# before the invalidating write
+_CACHE_TTL = 300
+_CLIENT_MAX_AGE = 60
+_SHARED_MAX_AGE = 60
+_REDIRECT_MAX_AGE = 86400
+_RADIUS_STEP_M = 250
+
 
 @router.post("", response_model=ServiceResponse, status_code=status.HTTP_201_CREATED)
 async def create_service(
     body: ServiceCreate,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     if current_user.role not in ("pro", "business", "admin"):
@@ -28,7 +60,9 @@ async def create_service(
             detail="Pro or Business plan required to list services",
         )
 
-    await rate_limit_by_user(current_user.id, max_requests=5, window_seconds=3600, action="create_service")
+    await rate_limit_by_user(
+        current_user.id, max_requests=5, window_seconds=3600, action="create_service", request=request
+    )
 
     # Check plan limit
     max_services = _PLAN_SERVICE_LIMITS.get(current_user.role, 0)
@@ -65,13 +99,13 @@ async def create_service(
     await db.flush()
     await db.refresh(svc)
 
-    return await _service_to_response(db, svc)
+    return _service_to_response(svc)
 
 
 @router.get("/mine", response_model=list[ServiceResponse])
 async def list_my_services(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """List current user's own services (all statuses)."""
     rows = await db.execute(
@@ -80,13 +114,13 @@ async def list_my_services(
         .order_by(Service.created_at.desc())
     )
     services = rows.scalars().all()
-    return [await _service_to_response(db, svc) for svc in services]
+    return [_service_to_response(svc) for svc in services]
 
 
 @router.get("/limits")
 async def service_limits(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Return the user's service plan limits and current usage."""
     max_services = _PLAN_SERVICE_LIMITS.get(current_user.role, 0)
@@ -109,66 +143,138 @@ async def service_limits(
 
 @router.get("", response_model=ServiceListResponse)
 async def list_services(
+    request: Request,
+    response: Response,
     lat: float = Query(..., ge=-90, le=90),
     lon: float = Query(..., ge=-180, le=180),
-    radius_m: int = Query(2000, ge=100, le=50000),
+    radius_m: int | None = Query(None, ge=100, le=50000),
     category: str | None = None,
     search: str | None = None,
+    sort: ServiceSort = ServiceSort.featured,
     offset: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=200),
+    limit: int = Query(_DEFAULT_LIMIT, ge=1, le=200),
     db: AsyncSession = Depends(get_db),
 ):
-    center = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
-
-    base = select(Service).where(
-        Service.status == "approved",
-        func.ST_DWithin(
-            cast(Service.geom, Geography),
-            cast(center, Geography),
-            radius_m,
-        ),
+    """List approved services around a point.
+
+    ``sort=featured`` (default) searches within ``radius_m`` (2 km if unset).
+    ``sort=nearest`` walks the geography GiST index with the KNN ``<->``
+    operator, so ``radius_m`` is optional; without it ``total`` is not
+    computed (null) since that would mean counting every listing.
+
+    Public and cacheable: non-canonical queries are redirected to their
+    snapped form (see ``_canonical_list_query``) so every client asking about
+    the same area shares one cache entry, in Redis and in nginx.
+    """
+    lat, lon = round(lat, 3), round(lon, 3)
+    if radius_m is not None:
+        radius_m = min(-(-radius_m // _RADIUS_STEP_M) * _RADIUS_STEP_M, 50000)
+    search = " ".join((search or "").lower().split())
+    canonical = _canonical_list_query(lat, lon, radius_m, category, search, sort, offset, limit)
+    if request.url.query != canonical:
+        return RedirectResponse(
+            f"{request.url.path}?{canonical}",
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": f"public, max-age={_REDIRECT_MAX_AGE}"},
+        )
+
+    _set_public_cache_headers(response, "services" + (f" services-{category}" if category else ""))
+    return await cache_get_or_set(
+        f"services:list:{canonical}",
+        lambda: _query_services(db, lat, lon, radius_m, category, search, sort, offset, limit),
+        ttl=_CACHE_TTL,
+        tags=("services",),
     )
 
+
+async def _query_services(
+    db: AsyncSession,
+    lat: float,
+    lon: float,
+    radius_m: int | None,
+    category: str | None,
+    search: str,
+    sort: ServiceSort,
+    offset: int,
+    limit: int,
+) -> dict:
+    nearest = sort == ServiceSort.nearest
+    if radius_m is None and not nearest:
+        radius_m = _DEFAULT_RADIUS_M
+
+    center = cast(func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326), Geography)
+    service_geog = cast(Service.geom, Geography)
+    distance = func.ST_Distance(service_geog, center)
+
+    base = select(Service, distance.label("distance_m")).where(Service.status == "approved")
+    if radius_m is not None:
+        base = base.where(func.ST_DWithin(service_geog, center, radius_m))
+
     if category:
         base = base.where(Service.category == category)
 
     if search:
-        search_pattern = f"%{search}%"
+        # Full-text match (stemmed, accent-insensitive) or a fuzzy match on the
+        # name for typos; both are served by GIN indexes
+        ts_query = func.websearch_to_tsquery(cast(_TS_CONFIG, REGCONFIG), search)
+        name_norm = func.f_unaccent(func.lower(Service.name))
+        term_norm = func.f_unaccent(func.lower(search))
         base = base.where(
-            Service.name.ilike(search_pattern) | Service.description.ilike(search_pattern)
+            Service.search_vector.op("@@")(ts_query) | term_norm.op("<%")(name_norm)
         )
 
-    count_q = select(func.count()).select_from(base.subquery())
-    total = (await db.execute(count_q)).scalar() or 0
-
-    # Business plan services ranked first, then by creation date
-    rows = await db.execute(
-        base.order_by(
-            (Service.plan_level == "business").desc(),
-            Service.created_at.desc(),
+    total = None
+    if radius_m is not None:
+        count_q = select(func.count()).select_from(base.subquery())
+        total = (await db.execute(count_q)).scalar() or 0
+
+    if nearest:
+        # Index-ordered KNN (idx_services_geog_approved); stops after offset + limit rows
+        ordering = (service_geog.op("<->")(center), Service.id)
+    elif search:
+        relevance = func.ts_rank_cd(Service.search_vector, ts_query, 32) + 0.5 * func.word_similarity(
+            term_norm, name_norm
         )
-        .offset(offset)
-        .limit(limit)
-    )
-    services = rows.scalars().all()
+        # Relevance decays to half at the edge of the search radius; business
+        # listings get a boost instead of an absolute priority
+        score = (
+            relevance
+            * (1 - 0.5 * distance / radius_m)
+            * case((Service.plan_level == "business", _BUSINESS_BOOST), else_=1.0)
+        )
+        ordering = (score.desc(), Service.created_at.desc())
+    else:
+        # Business plan services ranked first, then by creation date
+        ordering = ((Service.plan_level == "business").desc(), Service.created_at.desc())
+
+    rows = await db.execute(base.order_by(*ordering).offset(offset).limit(limit))
 
-    items = [await _service_to_response(db, svc) for svc in services]
-    return ServiceListResponse(services=items, total=total)
+    items = [_service_to_response(svc, distance_m) for svc, distance_m in rows.all()]
+    return ServiceListResponse(services=items, total=total).model_dump(mode="json")
 
 
 @router.get("/{service_id}", response_model=ServiceResponse)
-async def get_service(service_id: int, db: AsyncSession = Depends(get_db)):
-    svc = await db.get(Service, service_id)
-    if svc is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
-    return await _service_to_response(db, svc)
+async def get_service(service_id: int, response: Response, db: AsyncSession = Depends(get_db)):
+    async def load() -> dict:
+        svc = await db.get(Service, service_id)
+        if svc is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
+        return _service_to_response(svc).model_dump(mode="json")
+
+    cached = await cache_get_or_set(f"services:item:{service_id}", load, ttl=_CACHE_TTL, tags=("services",))
+
+    if cached["status"] == "approved":
+        _set_public_cache_headers(response, f"services service-{service_id}")
+    else:
+        response.headers["Cache-Control"] = "private, no-store"
+    return cached
 
 
 @router.put("/{service_id}", response_model=ServiceResponse)
 async def update_service(
     service_id: int,
     body: ServiceUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     svc = await db.get(Service, service_id)
@@ -188,64 +294,175 @@ async def update_service(
     db.add(svc)
     await db.flush()
     await db.refresh(svc)
-    return await _service_to_response(db, svc)
+    await db.commit()
+    await invalidate_service_cache()
+    return _service_to_response(svc)
 
 
 @router.delete("/{service_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_service(
     service_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     svc = await db.get(Service, service_id)
     if svc is None or svc.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
     await db.delete(svc)
-    await db.flush()
+    await db.commit()
+    await invalidate_service_cache()
 
 
 @router.patch("/{service_id}/approve", response_model=ServiceResponse)
 async def approve_service(
     service_id: int,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
-    svc = await db.get(Service, service_id)
-    if svc is None:
+    updated = await _set_status(db, [service_id], "approved")
+    if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
-
-    svc.status = "approved"
-    db.add(svc)
-    await db.flush()
-    await db.refresh(svc)
-    return await _service_to_response(db, svc)
+    await db.commit()
+    await invalidate_service_cache()
+    return _service_to_response(updated[0])
 
 
 @router.patch("/{service_id}/reject", response_model=ServiceResponse)
 async def reject_service(
     service_id: int,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
-    svc = await db.get(Service, service_id)
-    if svc is None:
+    updated = await _set_status(db, [service_id], "rejected")
+    if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
+    await db.commit()
+    await invalidate_service_cache()
+    return _service_to_response(updated[0])
 
-    svc.status = "rejected"
-    db.add(svc)
-    await db.flush()
-    await db.refresh(svc)
-    return await _service_to_response(db, svc)
 
+@router.get("/moderation/queue", response_model=list[ServiceResponse])
+async def moderation_queue(
+    response: Response,
+    cursor: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    admin: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Pending services, oldest first.
+
+    Reads idx_services_pending_created; the next page's cursor is returned in
+    the ``X-Next-Cursor`` header.
+    """
+    query = select(Service).where(Service.status == "pending")
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.where(tuple_(Service.created_at, Service.id) > tuple_(after_created_at, after_id))
+
+    rows = (
+        await db.execute(query.order_by(Service.created_at, Service.id).limit(limit + 1))
+    ).scalars().all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [_service_to_response(svc) for svc in rows]
+
+
+@router.post("/moderation/approve", response_model=ServiceModerationResponse)
+async def bulk_approve_services(
+    body: ServiceModerationRequest,
+    admin: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await _bulk_moderate(db, body.ids, "approved")
 
-async def _service_to_response(db: AsyncSession, svc: Service) -> ServiceResponse:
-    coords = await db.execute(
-        select(
-            func.ST_Y(svc.geom).label("lat"),
-            func.ST_X(svc.geom).label("lon"),
-        )
+
+@router.post("/moderation/reject", response_model=ServiceModerationResponse)
+async def bulk_reject_services(
+    body: ServiceModerationRequest,
+    admin: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await _bulk_moderate(db, body.ids, "rejected")
+
+
+async def _set_status(db: AsyncSession, ids: list[int], new_status: str) -> list[Service]:
+    """Set the status of many services in one ``UPDATE ... RETURNING``."""
+    result = await db.execute(
+        update(Service)
+        .where(Service.id.in_(ids))
+        .values(status=new_status)
+        .returning(Service)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars().all())
+
+
+async def _bulk_moderate(db: AsyncSession, ids: list[int], new_status: str) -> ServiceModerationResponse:
+    updated = await _set_status(db, ids, new_status)
+    if updated:
+        await db.commit()
+        await invalidate_service_cache()
+    found = {svc.id for svc in updated}
+    return ServiceModerationResponse(
+        services=[_service_to_response(svc) for svc in updated],
+        missing=sorted(set(ids) - found),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Public directory caching
+# ---------------------------------------------------------------------------
+
+def _canonical_list_query(
+    lat: float,
+    lon: float,
+    radius_m: int | None,
+    category: str | None,
+    search: str,
+    sort: ServiceSort,
+    offset: int,
+    limit: int,
+) -> str:
+    """Fixed-order query string for already snapped values; defaults are omitted.
+
+    Callers snap coordinates to 3 decimals (~110 m) and round radii up to the
+    next 250 m, which does not change what a user sees but collapses nearby
+    requests onto the same cache key.
+    """
+    params: list[tuple[str, str | int]] = [("lat", f"{lat:.3f}"), ("lon", f"{lon:.3f}")]
+    if radius_m is not None:
+        params.append(("radius_m", radius_m))
+    if category:
+        params.append(("category", category))
+    if search:
+        params.append(("search", search))
+    if sort != ServiceSort.featured:
+        params.append(("sort", sort.value))
+    if offset:
+        params.append(("offset", offset))
+    if limit != _DEFAULT_LIMIT:
+        params.append(("limit", limit))
+    return urlencode(params, quote_via=quote)
+
+
+def _set_public_cache_headers(response: Response, surrogate_keys: str) -> None:
+    # Short shared max-age bounds how long nginx may serve a listing after an
+    # invalidation; the Redis copy is dropped immediately
+    response.headers["Cache-Control"] = (
+        f"public, max-age={_CLIENT_MAX_AGE}, s-maxage={_SHARED_MAX_AGE}, stale-while-revalidate=30"
     )
-    row = coords.one()
+    response.headers["Surrogate-Key"] = surrogate_keys
+
+
+async def invalidate_service_cache() -> None:
+    """Drop every cached directory response (list and item) at once."""
+    await invalidate_tags("services")
+
+
+def _service_to_response(svc: Service, distance_m: float | None = None) -> ServiceResponse:
+    lat, lon = point_lat_lon(svc.geom)
     return ServiceResponse(
         id=svc.id,
         user_id=svc.user_id,
@@ -255,10 +472,11 @@ async def _service_to_response(db: AsyncSession, svc: Service) -> ServiceRespons
         phone=svc.phone,
         whatsapp=svc.whatsapp,
         hours=svc.hours,
-        lat=row.lat,
-        lon=row.lon,
+        lat=lat,
+        lon=lon,
         images=svc.images or [],
         status=svc.status,
         plan_level=svc.plan_level,
         created_at=svc.created_at,
+        distance_m=round(distance_m, 1) if distance_m is not None else None,
     )
@@ -4,8 +4,7 @@ import uuid
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 
 from app.core.config import settings
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.security import Principal, get_current_principal
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
@@ -31,7 +30,7 @@ def _detect_image_type(data: bytes) -> tuple[str, str] | None:
 @router.post("")
 async def upload_file(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
     contents = await file.read()
 
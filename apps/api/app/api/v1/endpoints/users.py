@@ -4,8 +4,8 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.database import get_db, get_read_db
+from app.core.security import Principal, get_current_principal, get_current_user, invalidate_principal
 from app.models.consent import UserConsent
 from app.models.incident import Incident, IncidentComment, IncidentVote
 from app.models.user import User
@@ -31,7 +31,8 @@ async def update_profile(
     if body.avatar_url is not None:
         current_user.avatar_url = body.avatar_url
     db.add(current_user)
-    await db.flush()
+    await db.commit()
+    await invalidate_principal(current_user.id)
     return UserResponse.model_validate(current_user)
 
 
@@ -133,7 +134,7 @@ async def export_my_data(
 async def record_consent(
     body: ConsentCreate,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     """Record user consent for LGPD compliance."""
@@ -159,8 +160,8 @@ async def record_consent(
 
 @router.get("/me/consents", response_model=list[ConsentResponse])
 async def list_consents(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """List all consent records for the current user."""
     result = await db.execute(
@@ -187,3 +188,4 @@ async def delete_account(
 ):
     await db.delete(current_user)
     await db.commit()
+    await invalidate_principal(current_user.id)
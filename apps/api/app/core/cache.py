@@ -0,0 +1,361 @@
+"""Two-tier cache: a per-process LRU in front of Redis.
+
+Values are encoded with orjson and zlib-compressed from
+``CACHE_COMPRESS_MIN_BYTES``. ``cache_get_or_set`` adds per-key single-flight
+(in-process futures plus a Redis lock across processes) and
+probabilistic early expiration (XFetch): as an entry nears expiry a caller
+occasionally recomputes it while everyone else is still served, so popular
+keys do not all miss at once. Keys can be tagged and dropped together with
+``invalidate_tags``.
+
+The local tier keeps an entry for at most ``CACHE_LOCAL_TTL_SECONDS``, which
+bounds how long other processes may serve a value after it was invalidated.
+"""
+
+import asyncio
+import math
+import random
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+import orjson
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.redis import redis_binary_client
+
+_PLAIN = b"j"
+_ZLIB = b"z"
+_TAG_PREFIX = "cache:tag:"
+_LOCK_PREFIX = "cache:lock:"
+_ERROR_PREFIX = "cache:error:"
+_LOCK_POLL_SECONDS = 0.05
+_ERROR_TTL_MS = 1000  # how long waiters are told about a failed computation
+
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_release_lock = redis_binary_client.register_script(_RELEASE_LOCK_LUA)
+
+_RENEW_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_renew_lock = redis_binary_client.register_script(_RENEW_LOCK_LUA)
+
+cache_requests = Counter(
+    "cache_requests_total",
+    "Cache lookups by key namespace and outcome",
+    ["namespace", "result"],
+)
+
+# key -> (local expiry on the monotonic clock, entry), least recently used first
+_local: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+# key -> computation in progress in this process
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def _namespace(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+def _encode(entry: dict) -> bytes:
+    raw = orjson.dumps(entry, default=str)
+    if len(raw) >= settings.CACHE_COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(raw, 1)
+    return _PLAIN + raw
+
+
+def _decode(blob: bytes) -> dict | None:
+    """Entry from its stored form; None for anything else (e.g. older formats)."""
+    try:
+        if blob[:1] == _ZLIB:
+            return orjson.loads(zlib.decompress(blob[1:]))
+        if blob[:1] == _PLAIN:
+            return orjson.loads(blob[1:])
+    except (orjson.JSONDecodeError, zlib.error):
+        pass
+    return None
+
+
+def _local_put(key: str, entry: dict) -> None:
+    remaining = entry["e"] - time.time()
+    if remaining <= 0:
+        return
+    _local[key] = (time.monotonic() + min(remaining, settings.CACHE_LOCAL_TTL_SECONDS), entry)
+    _local.move_to_end(key)
+    while len(_local) > settings.CACHE_LOCAL_MAX_ENTRIES:
+        _local.popitem(last=False)
+
+
+def _local_get(key: str) -> dict | None:
+    item = _local.get(key)
+    if item is None:
+        return None
+    if item[0] < time.monotonic():
+        del _local[key]
+        return None
+    _local.move_to_end(key)
+    return item[1]
+
+
+async def _read(key: str) -> dict | None:
+    """Entry from the local tier, else Redis (and copy it locally)."""
+    entry = _local_get(key)
+    if entry is not None:
+        cache_requests.inc(namespace=_namespace(key), result="hit_local")
+        return entry
+    blob = await redis_binary_client.get(key)
+    entry = _decode(blob) if blob is not None else None
+    if entry is None:
+        cache_requests.inc(namespace=_namespace(key), result="miss")
+        return None
+    _local_put(key, entry)
+    cache_requests.inc(namespace=_namespace(key), result="hit_redis")
+    return entry
+
+
+def _queue_write(pipe, key: str, value: Any, ttl: int, tags: Iterable[str], delta: float) -> bytes:
+    blob = _encode({"v": value, "e": time.time() + ttl, "d": delta})
+    pipe.set(key, blob, ex=ttl)
+    for tag in tags:
+        pipe.sadd(f"{_TAG_PREFIX}{tag}", key)
+        # Tag sets outlive their longest member a little, then go away
+        pipe.expire(f"{_TAG_PREFIX}{tag}", ttl + 60, gt=True)
+        pipe.expire(f"{_TAG_PREFIX}{tag}", ttl + 60, nx=True)
+    return blob
+
+
+async def _write(key: str, value: Any, ttl: int, tags: Iterable[str], delta: float) -> None:
+    pipe = redis_binary_client.pipeline(transaction=False)
+    blob = _queue_write(pipe, key, value, ttl, tags, delta)
+    await pipe.execute()
+    # Keep the decoded form locally so local hits match what Redis returns
+    _local_put(key, _decode(blob))
+
+
+def _should_refresh_early(entry: dict, beta: float) -> bool:
+    """XFetch: recompute before expiry with a probability that rises near it."""
+    delta = entry.get("d") or 0.0
+    if delta <= 0:
+        return False
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= entry["e"]
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+async def cache_get(key: str) -> Any | None:
+    """Cached value, or None if missing."""
+    entry = await _read(key)
+    return entry["v"] if entry is not None else None
+
+
+async def cache_set(key: str, value: Any, ttl: int = 300, tags: Iterable[str] = ()) -> None:
+    """Store a JSON-serialisable value for ``ttl`` seconds."""
+    await _write(key, value, ttl, tags, 0.0)
+
+
+async def cache_get_many(keys: Iterable[str]) -> dict[str, Any]:
+    """Cached values for ``keys`` (missing keys are left out), in one round trip."""
+    found: dict[str, Any] = {}
+    remote: list[str] = []
+    for key in dict.fromkeys(keys):
+        entry = _local_get(key)
+        if entry is not None:
+            cache_requests.inc(namespace=_namespace(key), result="hit_local")
+            found[key] = entry["v"]
+        else:
+            remote.append(key)
+    if not remote:
+        return found
+
+    for key, blob in zip(remote, await redis_binary_client.mget(remote)):
+        entry = _decode(blob) if blob is not None else None
+        if entry is None:
+            cache_requests.inc(namespace=_namespace(key), result="miss")
+            continue
+        _local_put(key, entry)
+        cache_requests.inc(namespace=_namespace(key), result="hit_redis")
+        found[key] = entry["v"]
+    return found
+
+
+async def cache_set_many(items: dict[str, Any], ttl: int = 300, tags: Iterable[str] = ()) -> None:
+    """Store several values with the same ``ttl`` and ``tags`` in one round trip."""
+    if not items:
+        return
+    tags = tuple(tags)
+    pipe = redis_binary_client.pipeline(transaction=False)
+    blobs = {key: _queue_write(pipe, key, value, ttl, tags, 0.0) for key, value in items.items()}
+    await pipe.execute()
+    for key, blob in blobs.items():
+        _local_put(key, _decode(blob))
+
+
+async def cache_delete(*keys: str) -> None:
+    for key in keys:
+        _local.pop(key, None)
+    if keys:
+        await redis_binary_client.delete(*keys)
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """Drop every key stored with any of ``tags``."""
+    tag_keys = [f"{_TAG_PREFIX}{tag}" for tag in tags]
+    if not tag_keys:
+        return
+    keys = [m.decode() for m in await redis_binary_client.sunion(tag_keys)]
+    for key in keys:
+        _local.pop(key, None)
+    await redis_binary_client.delete(*keys, *tag_keys)
+
+
+async def cache_get_or_set(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int = 300,
+    tags: Iterable[str] = (),
+    beta: float = 1.0,
+) -> Any:
+    """Cached value, computing and storing it on a miss.
+
+    Concurrent misses in one process share a single ``compute`` call; across
+    processes the first caller takes a Redis lock (renewed while it computes)
+    and the others wait for its result. If it fails, waiters get the same
+    HTTP error or, for other failures, compute themselves. ``compute`` must
+    return a JSON-serialisable value.
+    """
+    entry = await _read(key)
+    if entry is not None:
+        if key in _inflight or not _should_refresh_early(entry, beta):
+            return entry["v"]
+        cache_requests.inc(namespace=_namespace(key), result="early_refresh")
+        return await _compute_once(key, compute, ttl, tags, wait_for_peer=False, stale=entry["v"])
+    waiter = _inflight.get(key)
+    if waiter is not None:
+        try:
+            return await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            if not waiter.cancelled() or asyncio.current_task().cancelling():
+                raise
+            # The computing request went away; take over
+            return await cache_get_or_set(key, compute, ttl, tags, beta)
+    return await _compute_once(key, compute, ttl, tags, wait_for_peer=True)
+
+
+async def _compute_once(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int,
+    tags: Iterable[str],
+    wait_for_peer: bool,
+    stale: Any = None,
+) -> Any:
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    lock_key = f"{_LOCK_PREFIX}{key}"
+    lock_ttl_ms = int(settings.CACHE_LOCK_TTL_SECONDS * 1000)
+    token = uuid.uuid4().hex
+    locked = False
+    heartbeat: asyncio.Task | None = None
+    try:
+        locked = bool(await redis_binary_client.set(lock_key, token, nx=True, px=lock_ttl_ms))
+        if not locked:
+            if not wait_for_peer:
+                # Another process is already refreshing; keep serving the old value
+                future.set_result(stale)
+                return stale
+            value = await _wait_for_peer(key, lock_key)
+            if value is not None:
+                future.set_result(value)
+                return value
+        else:
+            # Keep the lock for as long as the computation runs, however slow
+            heartbeat = asyncio.create_task(_keep_lock(lock_key, token, lock_ttl_ms))
+
+        started = time.perf_counter()
+        value = await compute()
+        await _write(key, value, ttl, tags, time.perf_counter() - started)
+        future.set_result(value)
+        return value
+    except asyncio.CancelledError:
+        # Waiters notice the cancelled future and compute for themselves
+        future.cancel()
+        raise
+    except Exception as exc:
+        if not future.done():
+            future.set_exception(exc)
+            # Mark retrieved so an unawaited failure is not logged as lost
+            future.exception()
+        if locked:
+            await _record_failure(key, exc)
+        raise
+    finally:
+        _inflight.pop(key, None)
+        if heartbeat is not None:
+            heartbeat.cancel()
+        if locked:
+            await _release_lock(keys=[lock_key], args=[token])
+
+
+async def _keep_lock(lock_key: str, token: str, lock_ttl_ms: int) -> None:
+    """Extend the lock every third of its TTL until cancelled or no longer ours."""
+    while True:
+        await asyncio.sleep(lock_ttl_ms / 3000)
+        try:
+            if not await _renew_lock(keys=[lock_key], args=[token, lock_ttl_ms]):
+                return
+        except Exception:
+            # Redis unreachable: the lock simply expires and a peer may take over
+            return
+
+
+async def _record_failure(key: str, exc: Exception) -> None:
+    """Tell waiting processes the computation failed, so they do not wait it out.
+
+    HTTP errors (e.g. a 404) are handed to the waiters as they are; for
+    anything else the waiters compute for themselves.
+    """
+    error = {"status": exc.status_code, "detail": exc.detail} if isinstance(exc, HTTPException) else {}
+    await redis_binary_client.set(f"{_ERROR_PREFIX}{key}", orjson.dumps(error), px=_ERROR_TTL_MS)
+
+
+async def _wait_for_peer(key: str, lock_key: str) -> Any | None:
+    """Poll Redis while another process holds the compute lock.
+
+    Returns the value once written, or None (compute it yourself) when the
+    holder failed or gave up the lock without writing one. Re-raises an HTTP
+    error the holder recorded.
+    """
+    deadline = time.monotonic() + settings.CACHE_PEER_WAIT_MAX_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(_LOCK_POLL_SECONDS)
+        pipe = redis_binary_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.get(f"{_ERROR_PREFIX}{key}")
+        pipe.exists(lock_key)
+        blob, error, lock_held = await pipe.execute()
+        entry = _decode(blob) if blob is not None else None
+        if entry is not None:
+            _local_put(key, entry)
+            return entry["v"]
+        if error is not None:
+            error = orjson.loads(error)
+            if error.get("status") is not None:
+                raise HTTPException(status_code=error["status"], detail=error["detail"])
+            return None
+        if not lock_held:
+            return None
+    return None
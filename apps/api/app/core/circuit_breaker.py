@@ -0,0 +1,94 @@
+"""Per-provider health tracking and circuit breaking for upstream services."""
+
+import time
+from collections import deque
+
+from app.core.metrics import Counter, Gauge, Histogram
+
+provider_latency = Histogram(
+    "upstream_provider_latency_seconds",
+    "Latency of calls to external routing providers",
+    ["provider"],
+)
+provider_requests = Counter(
+    "upstream_provider_requests_total",
+    "Calls to external routing providers by outcome",
+    ["provider", "outcome"],
+)
+provider_circuit_open = Gauge(
+    "upstream_provider_circuit_open",
+    "1 while the provider's circuit breaker is open",
+    ["provider"],
+)
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open after a cooldown.
+
+    While open, callers fail fast instead of waiting out upstream timeouts.
+    In half-open state a single probe request is let through; its outcome
+    closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_seconds: float, window: int = 200):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self, latency: float) -> None:
+        self._latencies.append(latency)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+        provider_latency.observe(latency, provider=self.name)
+        provider_requests.inc(provider=self.name, outcome="success")
+        provider_circuit_open.set(0, provider=self.name)
+
+    def record_failure(self, latency: float) -> None:
+        self.consecutive_failures += 1
+        self._probing = False
+        provider_latency.observe(latency, provider=self.name)
+        provider_requests.inc(provider=self.name, outcome="error")
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            provider_circuit_open.set(1, provider=self.name)
+
+    def record_cancelled(self) -> None:
+        self._probing = False
+
+    def record_client_error(self, latency: float) -> None:
+        """The provider rejected the request itself (4xx): neither a failure nor a success."""
+        self._probing = False
+        provider_latency.observe(latency, provider=self.name)
+        provider_requests.inc(provider=self.name, outcome="client_error")
+
+    def record_rejected(self) -> None:
+        provider_requests.inc(provider=self.name, outcome="short_circuited")
+
+    def percentile(self, q: float, min_samples: int = 1) -> float | None:
+        """Latency percentile over recent successful calls, or None if too few."""
+        if len(self._latencies) < min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
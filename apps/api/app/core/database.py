@@ -1,38 +1,187 @@
+import asyncio
+import logging
+import time
 from collections.abc import AsyncGenerator
 
+from fastapi import Request
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base
 
 # Import geoalchemy2 so PostGIS column types are registered with SQLAlchemy
 import geoalchemy2  # noqa: F401
 
 from app.core.config import settings
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
 
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False,
-    pool_size=20,
-    max_overflow=10,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     pool_pre_ping=True,
 )
 
+
+class TrackedSession(Session):
+    """Session that records in ``info["wrote"]`` whether it changed anything."""
+
+
+@event.listens_for(TrackedSession, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(TrackedSession, "do_orm_execute")
+def _executed(orm_execute_state):
+    # Anything but a SELECT (DML, textual SQL) counts as a write
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+
 async_session_factory = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=TrackedSession,
+    expire_on_commit=False,
+)
+
+# Optional read replica; without one, get_read_db reads from the primary
+read_engine = (
+    create_async_engine(
+        settings.DATABASE_READ_URL,
+        echo=False,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+    if settings.DATABASE_READ_URL
+    else None
+)
+
+# Sessions for get_read_db run READ ONLY transactions; the primary's one
+# shares the primary pool
+_primary_read_session_factory = async_sessionmaker(
+    bind=engine.execution_options(postgresql_readonly=True),
+    class_=AsyncSession,
     expire_on_commit=False,
 )
+read_session_factory = (
+    async_sessionmaker(
+        bind=read_engine.execution_options(postgresql_readonly=True),
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+    if read_engine is not None
+    else None
+)
 
 Base = declarative_base()
 
+# Redis key prefix marking users whose reads must stay on the primary
+_RECENT_WRITE_PREFIX = "db:wrote:"
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """FastAPI dependency that yields an async database session."""
+
+def _has_writes(session: AsyncSession) -> bool:
+    """Whether the session wrote, or holds changes not flushed yet."""
+    return bool(session.info.get("wrote") or session.new or session.dirty or session.deleted)
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency that yields an async database session.
+
+    The session checks out a pooled connection only when first used, so a
+    request that never queries (e.g. the principal came from cache) costs no
+    connection. It commits only if something was written; otherwise closing
+    it just returns the connection, if any, to the pool.
+    """
     async with async_session_factory() as session:
         try:
             yield session
-            await session.commit()
+            wrote = _has_writes(session)
+            if wrote:
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
+        if wrote and read_engine is not None:
+            await _mark_recent_write(request)
+
+
+# ---------------------------------------------------------------------------
+# Read replica routing
+# ---------------------------------------------------------------------------
+
+# Zero when the replica has replayed everything it received; NULL on a
+# primary (e.g. a stand-in replica that is just another database)
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_replica_ok = False
+_replica_checked_at = float("-inf")
+_lag_lock = asyncio.Lock()
+
+
+async def _replica_usable() -> bool:
+    """Whether the replica is reachable and within the allowed lag.
+
+    Measured at most every ``DB_REPLICA_LAG_CHECK_SECONDS`` per process; other
+    requests use the last result while a check is running.
+    """
+    global _replica_ok, _replica_checked_at
+    if time.monotonic() - _replica_checked_at < settings.DB_REPLICA_LAG_CHECK_SECONDS or _lag_lock.locked():
+        return _replica_ok
+    async with _lag_lock:
+        try:
+            async with read_engine.connect() as conn:
+                lag = (await conn.execute(_LAG_SQL)).scalar()
+            _replica_ok = (lag or 0) <= settings.DB_REPLICA_MAX_LAG_SECONDS
+            if not _replica_ok:
+                logger.warning("Read replica is %.1fs behind; reading from the primary", lag)
+        except Exception:
+            logger.warning("Read replica unavailable; reading from the primary", exc_info=True)
+            _replica_ok = False
+        _replica_checked_at = time.monotonic()
+    return _replica_ok
+
+
+def _request_user_id(request: Request) -> int | None:
+    principal = getattr(request.state, "principal", None)
+    return principal.id if principal is not None else None
+
+
+async def _mark_recent_write(request: Request) -> None:
+    user_id = _request_user_id(request)
+    if user_id is not None:
+        await redis_client.set(f"{_RECENT_WRITE_PREFIX}{user_id}", "1", ex=settings.DB_READ_YOUR_WRITES_SECONDS)
+
+
+async def _wrote_recently(request: Request) -> bool:
+    user_id = _request_user_id(request)
+    if user_id is None:
+        return False
+    return await redis_client.exists(f"{_RECENT_WRITE_PREFIX}{user_id}") > 0
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only handlers, on the replica when it is safe.
+
+    Falls back to the primary when no replica is configured, when it lags
+    more than ``DB_REPLICA_MAX_LAG_SECONDS``, and for
+    ``DB_READ_YOUR_WRITES_SECONDS`` after the current user wrote something,
+    so users always see their own changes. Declare it after the auth
+    dependency so the user is known.
+
+    Transactions are READ ONLY and never committed, on either database.
+    """
+    factory = _primary_read_session_factory
+    if read_session_factory is not None and await _replica_usable() and not await _wrote_recently(request):
+        factory = read_session_factory
+    async with factory() as session:
+        yield session
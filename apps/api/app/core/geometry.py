@@ -0,0 +1,45 @@
+"""Decode stored PostGIS points without a database round trip.
+
+GeoAlchemy2 loads geometry columns as ``WKBElement`` (EWKB, as returned by
+``ST_AsEWKB``). Points are 21-25 bytes, so reading the coordinates in Python
+is far cheaper than a ``SELECT ST_Y(...), ST_X(...)`` per row.
+"""
+
+import struct
+from typing import Any
+
+_EWKB_Z = 0x80000000
+_EWKB_M = 0x40000000
+_EWKB_SRID = 0x20000000
+_WKB_POINT = 1
+
+
+def _wkb_bytes(geom: Any) -> bytes:
+    data = getattr(geom, "data", geom)
+    if isinstance(data, memoryview):
+        return data.tobytes()
+    if isinstance(data, str):
+        return bytes.fromhex(data)
+    return bytes(data)
+
+
+def point_xy(geom: Any) -> tuple[float, float]:
+    """Return ``(lon, lat)`` of an (E)WKB point geometry."""
+    wkb = _wkb_bytes(geom)
+    byte_order = "<" if wkb[0] == 1 else ">"
+    (geom_type,) = struct.unpack_from(f"{byte_order}I", wkb, 1)
+    offset = 5
+    if geom_type & _EWKB_SRID:
+        offset += 4
+    # Strip EWKB flags and ISO Z/M type offsets (1001, 2001, 3001)
+    if (geom_type & ~(_EWKB_Z | _EWKB_M | _EWKB_SRID)) % 1000 != _WKB_POINT:
+        raise ValueError("Geometry is not a point")
+    return struct.unpack_from(f"{byte_order}dd", wkb, offset)
+
+
+def point_lat_lon(geom: Any) -> tuple[float | None, float | None]:
+    """Return ``(lat, lon)`` of a stored point, or ``(None, None)`` when unset."""
+    if geom is None:
+        return None, None
+    lon, lat = point_xy(geom)
+    return lat, lon
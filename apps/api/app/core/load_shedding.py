@@ -0,0 +1,200 @@
+"""Per-process admission control: concurrency caps per cost class and load shedding.
+
+Every HTTP request is classified by method and path. ``heavy`` routes (route
+calculation, area listings, exports) are shed first: as soon as the database
+pool or the event loop nears saturation, or their own concurrency cap is
+reached. ``standard`` routes are shed only when the pool is exhausted or
+the loop is badly lagging. Health checks and metrics are never shed.
+
+Shed requests get an immediate 503 with ``Retry-After`` instead of queueing
+for a pool connection until they time out.
+
+Heavy routes are also rate limited per client (the token's user, else the
+client IP) with the GCRA limiter from ``app.core.rate_limit``, so a single
+client cannot take every heavy slot and get everyone else shed.
+"""
+
+import asyncio
+import json
+import re
+import time
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.database import engine, read_engine
+from app.core.metrics import Counter, Gauge
+from app.core.rate_limit import check_rate_limit
+
+HEAVY = "heavy"
+STANDARD = "standard"
+
+# (method, path pattern) -> cost class; first match wins, default is STANDARD
+_COST_CLASSES: list[tuple[str, re.Pattern, str | None]] = [
+    ("GET", re.compile(r"^/(health|metrics)$"), None),
+    ("POST", re.compile(r"^/api/v1/routes/"), HEAVY),
+    ("GET", re.compile(r"^/api/v1/incidents(/preview)?$"), HEAVY),
+    ("GET", re.compile(r"^/api/v1/services$"), HEAVY),
+    ("GET", re.compile(r"^/api/v1/neighborhoods/\d+/stats$"), HEAVY),
+    ("GET", re.compile(r"^/api/v1/users/me/export$"), HEAVY),
+    ("POST", re.compile(r"^/api/v1/uploads$"), HEAVY),
+]
+
+requests_shed = Counter(
+    "load_shed_requests_total",
+    "Requests answered 503 by the load shedder",
+    ["cost_class", "reason"],
+)
+requests_in_flight = Gauge(
+    "requests_in_flight",
+    "Requests currently being handled by this process",
+    ["cost_class"],
+)
+event_loop_lag = Gauge(
+    "event_loop_lag_seconds",
+    "Recent event loop scheduling delay",
+)
+
+_LAG_INTERVAL = 0.1
+_loop_lag = 0.0
+
+
+def classify(method: str, path: str) -> str | None:
+    """Cost class of a request, or None if it is never shed."""
+    for route_method, pattern, cost_class in _COST_CLASSES:
+        if method == route_method and pattern.match(path):
+            return cost_class
+    return STANDARD
+
+
+def _utilisation(pool_engine, size: int, overflow: int) -> float:
+    capacity = size + overflow
+    return pool_engine.pool.checkedout() / capacity if capacity else 0.0
+
+
+def db_pool_utilisation(method: str) -> float:
+    """Checked-out connections over pool size plus overflow.
+
+    GETs may be served by the read replica (``get_read_db``) or fall back to
+    the primary, so for them the fuller of the two pools counts.
+    """
+    primary = _utilisation(engine, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+    if method != "GET" or read_engine is None:
+        return primary
+    return max(primary, _utilisation(read_engine, settings.DB_READ_POOL_SIZE, settings.DB_READ_MAX_OVERFLOW))
+
+
+def _client_key(scope) -> str:
+    """Rate limit key for the request: the bearer token's user, else the client IP.
+
+    Only the signature is checked here; revocation is left to the endpoint.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            try:
+                payload = jwt.decode(value[7:].decode(), settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+            except (JWTError, UnicodeDecodeError):
+                break
+            if payload.get("type") == "access" and payload.get("sub") is not None:
+                return f"u:{payload['sub']}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+async def monitor_event_loop_lag() -> None:
+    """Measure how late a short sleep wakes up; run as a background task.
+
+    The reading decays by half each tick so a single stall does not keep
+    shedding for long, while sustained lag stays visible.
+    """
+    global _loop_lag
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(_LAG_INTERVAL)
+        measured = max(0.0, time.perf_counter() - start - _LAG_INTERVAL)
+        _loop_lag = max(measured, _loop_lag * 0.5)
+        event_loop_lag.set(round(_loop_lag, 4))
+
+
+class LoadSheddingMiddleware:
+    """Pure ASGI middleware; add it inside CORS so 429s and 503s still carry CORS headers."""
+
+    def __init__(self, app):
+        self.app = app
+        self.limits = {
+            HEAVY: settings.LOAD_SHED_HEAVY_CONCURRENCY,
+            STANDARD: settings.LOAD_SHED_STANDARD_CONCURRENCY,
+        }
+        self.in_flight = {HEAVY: 0, STANDARD: 0}
+
+    def _shed_reason(self, cost_class: str, method: str) -> str | None:
+        if self.in_flight[cost_class] >= self.limits[cost_class]:
+            return "concurrency"
+        lag_limit = settings.LOAD_SHED_LOOP_LAG_MS / 1000
+        pool = db_pool_utilisation(method)
+        if cost_class == HEAVY:
+            if pool >= settings.LOAD_SHED_DB_POOL_THRESHOLD:
+                return "db_pool"
+            if _loop_lag >= lag_limit:
+                return "loop_lag"
+        else:
+            if pool >= 1.0:
+                return "db_pool"
+            if _loop_lag >= 2 * lag_limit:
+                return "loop_lag"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.LOAD_SHED_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        cost_class = classify(scope["method"], scope["path"])
+        if cost_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        if cost_class == HEAVY:
+            try:
+                await check_rate_limit(
+                    f"heavy:{_client_key(scope)}", settings.HEAVY_RATE_LIMIT, settings.HEAVY_RATE_WINDOW
+                )
+            except HTTPException as exc:
+                requests_shed.inc(cost_class=cost_class, reason="client_rate")
+                await _send_error(send, exc.status_code, exc.detail, exc.headers or {})
+                return
+
+        reason = self._shed_reason(cost_class, scope["method"])
+        if reason is not None:
+            requests_shed.inc(cost_class=cost_class, reason=reason)
+            await _send_error(
+                send,
+                503,
+                "Server is busy, try again shortly",
+                {"Retry-After": str(settings.LOAD_SHED_RETRY_AFTER_SECONDS)},
+            )
+            return
+
+        self.in_flight[cost_class] += 1
+        requests_in_flight.set(self.in_flight[cost_class], cost_class=cost_class)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[cost_class] -= 1
+            requests_in_flight.set(self.in_flight[cost_class], cost_class=cost_class)
+
+
+async def _send_error(send, status_code: int, detail: str, headers: dict[str, str]) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *((name.lower().encode(), value.encode()) for name, value in headers.items()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
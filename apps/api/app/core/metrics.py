@@ -0,0 +1,146 @@
+"""Minimal in-process metrics with Prometheus text exposition.
+
+Metrics are per worker process; scrape every worker (or aggregate in the
+collector) the same way as with the multiprocess Prometheus client.
+Counters updated from Celery workers are kept in Redis instead (see
+``SharedCounter``) and rendered by the API's ``/metrics`` endpoint.
+"""
+
+import threading
+from collections.abc import Iterable
+
+_DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = _DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for key, counts in sorted(self._counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {counts[-1]}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {self._sums[key]}")
+            lines.append(f"{self.name}_count{plain} {counts[-1]}")
+        return lines
+
+
+class SharedCounter:
+    """Counter with a single label, aggregated across processes in a Redis hash.
+
+    ``inc`` only queues a command, so it works with sync and async pipelines.
+    """
+
+    def __init__(self, name: str, documentation: str, labelname: str):
+        self.name = name
+        self.documentation = documentation
+        self.labelname = labelname
+        self.key = f"metrics:{name}"
+        SHARED_REGISTRY.append(self)
+
+    def inc(self, pipe, label: str, amount: int = 1) -> None:
+        pipe.hincrby(self.key, label, amount)
+
+    def render(self, values: dict[str, str]) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels((self.labelname,), (label,))} {value}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+SHARED_REGISTRY: list[SharedCounter] = []
+
+
+def render_metrics() -> str:
+    """Render every registered metric in Prometheus text format."""
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+async def render_shared_metrics(client) -> str:
+    """Render Redis-backed counters using an async Redis client."""
+    lines: list[str] = []
+    for counter in SHARED_REGISTRY:
+        lines.extend(counter.render(await client.hgetall(counter.key)))
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,121 @@
+"""Encoded polyline helpers (Google polyline algorithm).
+
+OpenRouteService returns route geometries as encoded polylines (precision 5),
+while OSRM is asked for GeoJSON. These helpers normalise both into plain
+``[lon, lat]`` coordinate lists, simplify them for a map zoom level, and
+re-encode them compactly (precision 6) for caching and transport.
+"""
+
+import math
+from typing import Any
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> list[list[float]]:
+    """Decode an encoded polyline into a list of ``[lon, lat]`` pairs."""
+    factor = 10 ** precision
+    coords: list[list[float]] = []
+    index = 0
+    lat = 0
+    lon = 0
+    length = len(encoded)
+
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = 0
+            result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coords.append([lon / factor, lat / factor])
+
+    return coords
+
+
+def encode_polyline(coords: list[list[float]], precision: int = 5) -> str:
+    """Encode ``[lon, lat]`` pairs as an encoded polyline."""
+    factor = 10 ** precision
+    out: list[str] = []
+    prev_lat = 0
+    prev_lon = 0
+
+    for lon, lat in coords:
+        ilat = round(lat * factor)
+        ilon = round(lon * factor)
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lon = ilat, ilon
+
+    return "".join(out)
+
+
+def zoom_tolerance_m(zoom: int, lat: float) -> float:
+    """Ground size of one 256px-tile pixel at ``zoom`` and latitude ``lat``."""
+    return 156_543.03392 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def simplify(coords: list[list[float]], tolerance_m: float) -> list[list[float]]:
+    """Douglas-Peucker simplification of ``[lon, lat]`` pairs.
+
+    Works on an equirectangular projection in metres; endpoints are always kept.
+    """
+    n = len(coords)
+    if tolerance_m <= 0 or n < 3:
+        return coords
+
+    kx = 111_320 * math.cos(math.radians(coords[0][1]))
+    ky = 110_540
+    pts = [(lon * kx, lat * ky) for lon, lat in coords]
+    tol2 = tolerance_m * tolerance_m
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = pts[first]
+        dx = pts[last][0] - ax
+        dy = pts[last][1] - ay
+        seg_len2 = dx * dx + dy * dy
+
+        max_d2 = -1.0
+        index = first
+        for i in range(first + 1, last):
+            px = pts[i][0] - ax
+            py = pts[i][1] - ay
+            t = 0.0 if seg_len2 == 0 else max(0.0, min(1.0, (px * dx + py * dy) / seg_len2))
+            ex = px - t * dx
+            ey = py - t * dy
+            d2 = ex * ex + ey * ey
+            if d2 > max_d2:
+                max_d2 = d2
+                index = i
+
+        if max_d2 > tol2:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [c for c, k in zip(coords, keep) if k]
+
+
+def geometry_coords(geometry: Any) -> list[list[float]]:
+    """Return ``[lon, lat]`` pairs from a GeoJSON LineString or encoded polyline."""
+    if not geometry:
+        return []
+    if isinstance(geometry, str):
+        return decode_polyline(geometry)
+    if isinstance(geometry, dict):
+        return [list(c[:2]) for c in geometry.get("coordinates", [])]
+    return []
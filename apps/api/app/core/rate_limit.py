@@ -1,37 +1,144 @@
-"""Redis-based sliding window rate limiter."""
+"""Redis-based GCRA rate limiter with a per-process pre-filter.
+
+Limits are "``max_requests`` per ``window_seconds``" enforced with the
+generic cell rate algorithm: one request is earned back every
+``window_seconds / max_requests`` and up to ``max_requests`` may be spent at
+once. Redis stores a single theoretical arrival time per key, updated by one
+Lua call, so there is no read-then-write race.
+
+Each process also keeps a token bucket with the same rate and capacity that
+only holds tokens for requests Redis accepted. Once it is empty the process
+has on its own used up the global quota, so it can answer 429 without asking
+Redis.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 
 from fastapi import HTTPException, Request, status
 
 from app.core.redis import redis_client
 
+# Returns {allowed, remaining, retry_after_ms, reset_ms}
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+
+if now < allow_at then
+    return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.floor((window - (new_tat - now)) / interval), 0, new_tat - now}
+"""
+_gcra = redis_client.register_script(_GCRA_LUA)
+
+# Keys tracked by the local pre-filter per process
+_LOCAL_MAX_KEYS = 10000
+
+
+@dataclass(slots=True)
+class RateLimitResult:
+    limit: int
+    remaining: int
+    reset_seconds: float
+
+    def headers(self) -> dict[str, str]:
+        return {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_seconds)),
+        }
+
+
+class _LocalBuckets:
+    """Per-process token buckets keyed like the Redis limiter, least recently used evicted."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def _refill(self, key: str, capacity: int, rate: float, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        return min(capacity, tokens + (now - updated) * rate)
+
+    def seconds_until_token(self, key: str, capacity: int, rate: float) -> float:
+        """0 if a token is available, else how long until one is."""
+        tokens = self._refill(key, capacity, rate, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / rate
+
+    def take(self, key: str, capacity: int, rate: float) -> None:
+        now = time.monotonic()
+        tokens = self._refill(key, capacity, rate, now)
+        self._buckets[key] = (max(0.0, tokens - 1), now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+_local = _LocalBuckets(_LOCAL_MAX_KEYS)
+
+
+def _too_many(result: RateLimitResult, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Rate limit exceeded. Try again later.",
+        headers={**result.headers(), "Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
 
 async def check_rate_limit(
     key: str,
     max_requests: int,
     window_seconds: int,
-) -> None:
-    """Check and increment rate limit counter. Raises 429 if exceeded."""
+    request: Request | None = None,
+) -> RateLimitResult:
+    """Count one request against the limit. Raises 429 if exceeded.
+
+    With ``request`` given, the ``RateLimit-*`` headers are attached to the
+    response by the request middleware in ``app.main``.
+    """
     redis_key = f"rl:{key}"
-    current = await redis_client.get(redis_key)
+    rate = max_requests / window_seconds
+
+    wait = _local.seconds_until_token(redis_key, max_requests, rate)
+    if wait > 0:
+        raise _too_many(RateLimitResult(max_requests, 0, wait), wait)
 
-    if current is not None and int(current) >= max_requests:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Rate limit exceeded. Try again later.",
-        )
+    interval_ms = window_seconds * 1000 / max_requests
+    allowed, remaining, retry_after_ms, reset_ms = await _gcra(
+        keys=[redis_key], args=[interval_ms, window_seconds * 1000]
+    )
+    result = RateLimitResult(max_requests, int(remaining), float(reset_ms) / 1000)
+    if not allowed:
+        raise _too_many(result, float(retry_after_ms) / 1000)
 
-    pipe = redis_client.pipeline()
-    pipe.incr(redis_key)
-    pipe.expire(redis_key, window_seconds)
-    await pipe.execute()
+    _local.take(redis_key, max_requests, rate)
+    if request is not None:
+        request.state.rate_limit = result
+    return result
 
 
 async def rate_limit_by_ip(request: Request, max_requests: int, window_seconds: int, action: str) -> None:
     """Rate limit by client IP address."""
     client_ip = request.client.host if request.client else "unknown"
-    await check_rate_limit(f"{action}:{client_ip}", max_requests, window_seconds)
+    await check_rate_limit(f"{action}:{client_ip}", max_requests, window_seconds, request)
 
 
-async def rate_limit_by_user(user_id: int, max_requests: int, window_seconds: int, action: str) -> None:
+async def rate_limit_by_user(
+    user_id: int,
+    max_requests: int,
+    window_seconds: int,
+    action: str,
+    request: Request | None = None,
+) -> None:
     """Rate limit by authenticated user ID."""
-    await check_rate_limit(f"{action}:u:{user_id}", max_requests, window_seconds)
+    await check_rate_limit(f"{action}:u:{user_id}", max_requests, window_seconds, request)
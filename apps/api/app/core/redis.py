@@ -1,16 +1,31 @@
 from __future__ import annotations
 
-import json
+import asyncio
 from typing import Any
 
 import redis.asyncio as aioredis
 
 from app.core.config import settings
 
-redis_client: aioredis.Redis = aioredis.from_url(
-    settings.REDIS_URL,
-    decode_responses=True,
-)
+
+def _pool(**kwargs: Any) -> aioredis.BlockingConnectionPool:
+    # Blocking pool: when every connection is busy, callers wait up to
+    # REDIS_POOL_TIMEOUT for one instead of failing with "Too many connections"
+    return aioredis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        **kwargs,
+    )
+
+
+redis_client: aioredis.Redis = aioredis.Redis(connection_pool=_pool(decode_responses=True))
+
+# Raw bytes, for values that are not text (see app.core.cache)
+redis_binary_client: aioredis.Redis = aioredis.Redis(connection_pool=_pool())
 
 
 async def get_redis() -> aioredis.Redis:
@@ -18,27 +33,65 @@ async def get_redis() -> aioredis.Redis:
     return redis_client
 
 
-# ---------------------------------------------------------------------------
-# Cache helper functions
-# ---------------------------------------------------------------------------
+async def disconnect_pools() -> None:
+    """Close every pooled connection (e.g. before the event loop goes away)."""
+    await redis_client.connection_pool.disconnect()
+    await redis_binary_client.connection_pool.disconnect()
+
+
+class RedisBatch:
+    """Commands queued on one pipeline and sent in a single round trip.
+
+    Each queued command returns a future that is resolved when the batch
+    runs, on leaving the ``async with`` block::
+
+        async with redis_batch() as batch:
+            revoked = batch.exists(revoked_key)
+            cached = batch.get(principal_key)
+        if revoked.result(): ...
+
+    Errors are reported per command through its future.
+    """
+
+    def __init__(self, client: aioredis.Redis):
+        self._pipe = client.pipeline(transaction=False)
+        self._futures: list[asyncio.Future] = []
+
+    def __getattr__(self, name: str):
+        command = getattr(self._pipe, name)
+
+        def queue(*args: Any, **kwargs: Any) -> asyncio.Future:
+            command(*args, **kwargs)
+            future = asyncio.get_running_loop().create_future()
+            self._futures.append(future)
+            return future
+
+        return queue
 
-async def cache_get(key: str) -> Any | None:
-    """Retrieve a JSON-serialised value from Redis, or None if missing."""
-    raw = await redis_client.get(key)
-    if raw is None:
-        return None
-    try:
-        return json.loads(raw)
-    except (json.JSONDecodeError, TypeError):
-        return raw
+    async def execute(self) -> None:
+        if not self._futures:
+            return
+        results = await self._pipe.execute(raise_on_error=False)
+        for future, result in zip(self._futures, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+                # Callers may ignore a result; mark it retrieved so the error
+                # is not logged as "never retrieved" (result() still raises)
+                future.exception()
+            else:
+                future.set_result(result)
+        self._futures = []
 
+    async def __aenter__(self) -> RedisBatch:
+        return self
 
-async def cache_set(key: str, value: Any, ttl: int = 300) -> None:
-    """Store a value in Redis as JSON with a TTL (seconds)."""
-    serialised = json.dumps(value, default=str)
-    await redis_client.set(key, serialised, ex=ttl)
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.execute()
+        else:
+            await self._pipe.reset()
 
 
-async def cache_delete(key: str) -> None:
-    """Remove a key from Redis."""
-    await redis_client.delete(key)
+def redis_batch(client: aioredis.Redis | None = None) -> RedisBatch:
+    """Batch commands for ``client`` (the text client by default)."""
+    return RedisBatch(client or redis_client)
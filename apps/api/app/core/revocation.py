@@ -0,0 +1,108 @@
+"""Per-process filter of revoked token IDs, kept in sync over Redis pub/sub.
+
+``revoke_token`` records each revoked access-token JTI in a Redis sorted set
+(scored by expiry, at most the access token lifetime ahead) and publishes it
+on ``REVOCATION_CHANNEL``. Every API process subscribes, loads the sorted
+set once subscribed, and adds published JTIs to a Bloom filter.
+Authentication only asks Redis about JTIs the filter might contain, or about
+every JTI while the filter is not in sync (startup, lost subscription).
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "auth:revocations"
+REVOCATION_INDEX_KEY = "revoked:index"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no removal; rebuild to expire)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationFilter:
+    def __init__(self):
+        self.ready = False
+        self._bloom = self._new_bloom()
+
+    @staticmethod
+    def _new_bloom() -> BloomFilter:
+        return BloomFilter(settings.REVOCATION_FILTER_CAPACITY, settings.REVOCATION_FILTER_ERROR_RATE)
+
+    @classmethod
+    def _build(cls, jtis: list[str]) -> BloomFilter:
+        bloom = cls._new_bloom()
+        for jti in jtis:
+            bloom.add(jti)
+        return bloom
+
+    def might_be_revoked(self, jti: str) -> bool:
+        return not self.ready or jti in self._bloom
+
+    async def _rebuild(self) -> None:
+        """Reload unexpired JTIs from the sorted set, dropping expired ones."""
+        now = time.time()
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zremrangebyscore(REVOCATION_INDEX_KEY, "-inf", now)
+        pipe.zrangebyscore(REVOCATION_INDEX_KEY, now, "+inf")
+        _, jtis = await pipe.execute()
+        # Hashing up to REVOCATION_FILTER_CAPACITY ids is CPU work; keep it off the loop
+        self._bloom = await asyncio.to_thread(self._build, jtis)
+        logger.info("Revocation filter loaded with %d token ids", len(jtis))
+
+    async def run(self) -> None:
+        """Subscribe, bootstrap, then apply published revocations until cancelled.
+
+        Subscribing before loading the sorted set means a revocation made
+        during the load is still delivered afterwards.
+        """
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                await self._rebuild()
+                self.ready = True
+                rebuild_at = time.monotonic() + settings.REVOCATION_FILTER_REBUILD_SECONDS
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._bloom.add(message["data"])
+                    if time.monotonic() >= rebuild_at:
+                        await self._rebuild()
+                        rebuild_at = time.monotonic() + settings.REVOCATION_FILTER_REBUILD_SECONDS
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Revocation subscription lost; checking Redis on every request", exc_info=True)
+                await asyncio.sleep(1)
+            finally:
+                self.ready = False
+                await pubsub.reset()
+
+
+revocation_filter = RevocationFilter()
@@ -1,7 +1,14 @@
+import asyncio
+import json
+import os
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta, timezone
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -10,13 +17,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.database import get_db
-from app.core.redis import redis_client
+from app.core.metrics import Counter, Histogram
+from app.core.redis import redis_batch, redis_client
+from app.core.revocation import REVOCATION_CHANNEL, REVOCATION_INDEX_KEY, revocation_filter
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer()
 
 # Redis key prefix for revoked tokens
 _REVOKED_PREFIX = "revoked:"
+# Redis key prefix for cached principals
+_PRINCIPAL_PREFIX = "principal:"
 
 
 # ---------------------------------------------------------------------------
@@ -59,13 +70,27 @@ def verify_token(token: str) -> dict:
         ) from exc
 
 
-async def revoke_token(jti: str, ttl_seconds: int) -> None:
-    """Add a JTI to the revocation blacklist in Redis."""
-    await redis_client.set(f"{_REVOKED_PREFIX}{jti}", "1", ex=ttl_seconds)
+async def revoke_token(jti: str, ttl_seconds: int, token_type: str = "access") -> None:
+    """Add a JTI to the revocation blacklist in Redis.
 
+    Access tokens are also indexed and published so every API process adds
+    them to its local filter. Refresh tokens are only checked on
+    ``/auth/refresh``, straight against Redis, so they stay out of the
+    filter. Index entries never outlive the access token lifetime.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(f"{_REVOKED_PREFIX}{jti}", "1", ex=ttl_seconds)
+    if token_type == "access":
+        ttl_seconds = min(ttl_seconds, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        pipe.zadd(REVOCATION_INDEX_KEY, {jti: time.time() + ttl_seconds})
+        pipe.publish(REVOCATION_CHANNEL, jti)
+    await pipe.execute()
 
-async def is_token_revoked(jti: str) -> bool:
-    """Check if a JTI has been revoked."""
+
+async def is_token_revoked(jti: str, token_type: str = "access") -> bool:
+    """Check if a JTI has been revoked; for access tokens Redis is only asked on a local filter hit."""
+    if token_type == "access" and not revocation_filter.might_be_revoked(jti):
+        return False
     return await redis_client.exists(f"{_REVOKED_PREFIX}{jti}") > 0
 
 
@@ -73,23 +98,143 @@ async def is_token_revoked(jti: str) -> bool:
 # Password helpers
 # ---------------------------------------------------------------------------
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt releases the GIL, so a thread per core hashes in parallel without
+# blocking the event loop
+_hash_workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+_hash_pool = ThreadPoolExecutor(max_workers=_hash_workers, thread_name_prefix="bcrypt")
+_hash_capacity = _hash_workers + settings.PASSWORD_HASH_MAX_QUEUE
+_hash_pending = 0
+
+password_hash_wait = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time password hashes wait for a bcrypt worker thread",
+    ["op"],
+)
+password_hash_rejected = Counter(
+    "password_hash_rejected_total",
+    "Password hashes refused with 503 because the bcrypt queue was full",
+    ["op"],
+)
+
+
+def _release_hash_slot() -> None:
+    global _hash_pending
+    _hash_pending -= 1
+
+
+async def _run_in_hash_pool(op: str, fn, *args):
+    """Run a bcrypt call on the hash pool; 503 if too many are already waiting."""
+    global _hash_pending
+    if _hash_pending >= _hash_capacity:
+        password_hash_rejected.inc(op=op)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    loop = asyncio.get_running_loop()
+    submitted = time.monotonic()
+
+    def timed():
+        password_hash_wait.observe(time.monotonic() - submitted, op=op)
+        return fn(*args)
+
+    # The slot is released when the thread finishes, even if the request was
+    # cancelled while waiting, so the bound reflects real pool load
+    _hash_pending += 1
+    future = _hash_pool.submit(timed)
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(_release_hash_slot))
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password(password: str) -> str:
+    return await _run_in_hash_pool("hash", pwd_context.hash, password)
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await _run_in_hash_pool("verify", pwd_context.verify, plain, hashed)
+
+
+# ---------------------------------------------------------------------------
+# Principal cache
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The authenticated user's fields that endpoints actually read.
+
+    Cached per process and in Redis so most requests never query ``users``;
+    endpoints that need the full row depend on ``get_current_user`` instead.
+    """
+
+    id: int
+    role: str
+    reputation: int
+    name: str
+
+
+# user_id -> (expires_at, principal), least recently used first
+_local_principals: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+
+
+def _local_get(user_id: int) -> Principal | None:
+    entry = _local_principals.get(user_id)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        del _local_principals[user_id]
+        return None
+    _local_principals.move_to_end(user_id)
+    return entry[1]
+
+
+def _local_put(principal: Principal) -> None:
+    _local_principals[principal.id] = (time.monotonic() + settings.PRINCIPAL_LOCAL_TTL_SECONDS, principal)
+    _local_principals.move_to_end(principal.id)
+    while len(_local_principals) > settings.PRINCIPAL_LOCAL_MAX_ENTRIES:
+        _local_principals.popitem(last=False)
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """Drop a cached principal after its role, reputation or name changed.
+
+    Call after the change is committed. Other API processes may keep their
+    local copy for up to ``PRINCIPAL_LOCAL_TTL_SECONDS``.
+    """
+    _local_principals.pop(user_id, None)
+    await redis_client.delete(f"{_PRINCIPAL_PREFIX}{user_id}")
+
+
+async def _load_principal(db: AsyncSession, user_id: int) -> Principal | None:
+    from app.models.user import User
+
+    row = (
+        await db.execute(select(User.id, User.role, User.reputation, User.name).where(User.id == user_id))
+    ).first()
+    if row is None:
+        return None
+    principal = Principal(id=row.id, role=row.role or "free", reputation=row.reputation or 0, name=row.name)
+    await redis_client.set(
+        f"{_PRINCIPAL_PREFIX}{user_id}", json.dumps(asdict(principal)), ex=settings.PRINCIPAL_CACHE_TTL_SECONDS
+    )
+    return principal
 
 
 # ---------------------------------------------------------------------------
 # FastAPI dependencies
 # ---------------------------------------------------------------------------
 
-async def get_current_user(
+async def get_current_principal(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
     db: AsyncSession = Depends(get_db),
-):
-    """Extract and return the current User from the Bearer token."""
+) -> Principal:
+    """Authenticate the Bearer token and return the cached ``Principal``.
+
+    The revocation check (only on a local filter hit) and the Redis principal
+    lookup share one round trip; ``users`` is only queried on a cache miss.
+    """
     payload = verify_token(credentials.credentials)
 
     if payload.get("type") != "access":
@@ -98,26 +243,52 @@ async def get_current_user(
             detail="Invalid token type",
         )
 
-    # Check JTI revocation
-    jti = payload.get("jti")
-    if jti and await is_token_revoked(jti):
+    user_id: int | None = payload.get("sub")
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has been revoked",
+            detail="Token missing subject",
         )
+    user_id = int(user_id)
 
-    user_id: int | None = payload.get("sub")
-    if user_id is None:
+    # With a local filter miss and a local principal hit, no Redis call is made
+    jti = payload.get("jti")
+    check_revoked = bool(jti) and revocation_filter.might_be_revoked(jti)
+    principal = _local_get(user_id)
+    async with redis_batch() as batch:
+        revoked = batch.exists(f"{_REVOKED_PREFIX}{jti}") if check_revoked else None
+        cached = batch.get(f"{_PRINCIPAL_PREFIX}{user_id}") if principal is None else None
+    if revoked is not None and revoked.result() > 0:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token missing subject",
+            detail="Token has been revoked",
         )
+    if principal is None:
+        cached = cached.result()
+        if cached is not None:
+            principal = Principal(**json.loads(cached))
+        else:
+            principal = await _load_principal(db, user_id)
+        if principal is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        _local_put(principal)
+    # For read-your-writes routing in app.core.database
+    request.state.principal = principal
+    return principal
+
 
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """Return the full ``User`` row for endpoints that need more than ``Principal``."""
     # Deferred import to avoid circular dependency
     from app.models.user import User
 
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    user = await db.get(User, principal.id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -127,8 +298,8 @@ async def get_current_user(
 
 
 async def get_admin_user(
-    current_user=Depends(get_current_user),
-):
+    current_user: Principal = Depends(get_current_principal),
+) -> Principal:
     """Ensure the current user has the admin role."""
     if current_user.role != "admin":
         raise HTTPException(
@@ -1,16 +1,22 @@
+import asyncio
 import logging
 import os
 import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
 
 from app.core.config import settings
 from app.core.database import engine
+from app.core.load_shedding import LoadSheddingMiddleware, monitor_event_loop_lag
 from app.core.logging_config import setup_logging
+from app.core.metrics import render_metrics, render_shared_metrics
+from app.core.redis import redis_client
+from app.core.revocation import revocation_filter
 
 # Initialize structured logging
 setup_logging(level=os.getenv("LOG_LEVEL", "INFO"))
@@ -23,9 +29,16 @@ async def lifespan(app: FastAPI):
     # --- Startup ---
     async with engine.connect() as conn:
         await conn.execute(text("SELECT 1"))
+    background = [
+        asyncio.create_task(revocation_filter.run()),
+        asyncio.create_task(monitor_event_loop_lag()),
+    ]
     logger.info("Application started successfully")
     yield
     # --- Shutdown ---
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
     await engine.dispose()
     logger.info("Application shut down")
 
@@ -38,6 +51,9 @@ app = FastAPI(
     redoc_url=None,
 )
 
+# ---------- Load shedding (innermost; CORS and request logging wrap it) ----------
+app.add_middleware(LoadSheddingMiddleware)
+
 
 # ---------- Request logging + Security headers middleware ----------
 @app.middleware("http")
@@ -61,6 +77,11 @@ async def request_middleware(request: Request, call_next):
         },
     )
 
+    # Quota headers from app.core.rate_limit (429 responses carry their own)
+    rate_limit = getattr(request.state, "rate_limit", None)
+    if rate_limit is not None:
+        response.headers.update(rate_limit.headers())
+
     # Security headers
     response.headers["X-Content-Type-Options"] = "nosniff"
     response.headers["X-Frame-Options"] = "DENY"
@@ -77,6 +98,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
     allow_headers=["Authorization", "Content-Type"],
+    expose_headers=["X-Next-Cursor", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After"],
 )
 
 # ---------- Routers ----------
@@ -93,3 +115,10 @@ app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads"
 @app.get("/health", tags=["health"])
 async def health():
     return {"status": "ok"}
+
+
+# ---------- Metrics (internal; not proxied by nginx) ----------
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body = render_metrics() + await render_shared_metrics(redis_client)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
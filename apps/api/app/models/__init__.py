@@ -1,19 +1,24 @@
 from app.models.user import User
+from app.models.neighborhood import Neighborhood
 from app.models.incident import Incident, IncidentVote, IncidentComment
-from app.models.alert import AlertPreference
+from app.models.alert import AlertInboxItem, AlertPreference
 from app.models.user_location import UserLocation
 from app.models.subscription import Subscription
 from app.models.service import Service
 from app.models.consent import UserConsent
+from app.models.push_subscription import PushSubscription
 
 __all__ = [
     "User",
+    "Neighborhood",
     "Incident",
     "IncidentVote",
     "IncidentComment",
     "AlertPreference",
+    "AlertInboxItem",
     "UserLocation",
     "Subscription",
     "Service",
     "UserConsent",
+    "PushSubscription",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func, ARRAY, Float
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index, func, ARRAY, Float, text
 from geoalchemy2 import Geometry
 
 from app.core.database import Base
@@ -6,14 +6,44 @@ from app.core.database import Base
 
 class AlertPreference(Base):
     __tablename__ = "alert_preferences"
+    __table_args__ = (
+        Index("idx_alert_preferences_area", "area", postgresql_using="gist"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     mode = Column(String, nullable=False)  # neighborhood, radius
     neighborhood_name = Column(String, nullable=True)
+    neighborhood_id = Column(Integer, ForeignKey("neighborhoods.id", ondelete="CASCADE"), nullable=True, index=True)
     center_geom = Column(Geometry("POINT", srid=4326), nullable=True)
     radius_km = Column(Float, nullable=True)
+    # Buffered radius polygon, so new incidents can be matched via the GiST index
+    area = Column(Geometry("POLYGON", srid=4326, spatial_index=False), nullable=True)
     types = Column(ARRAY(String), nullable=True)
     min_severity = Column(String, default="baixa")
     enabled = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class AlertInboxItem(Base):
+    """Incident delivered to a user's alert feed (filled on incident creation)."""
+
+    __tablename__ = "alert_inbox"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    incident_id = Column(Integer, ForeignKey("incidents.id", ondelete="CASCADE"), primary_key=True)
+    distance_m = Column(Float, nullable=True)  # nearest matching radius preference; None for neighborhoods
+    created_at = Column(DateTime(timezone=True), nullable=False)  # incident creation time, the feed order
+    delivered_at = Column(DateTime(timezone=True), server_default=func.now())
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    stale = Column(Boolean, nullable=False, default=False, server_default=text("false"))  # incident no longer open
+
+    __table_args__ = (
+        Index("idx_alert_inbox_user_created", "user_id", "created_at", "incident_id"),
+        Index("idx_alert_inbox_created", "created_at"),  # age-based trim
+        Index(
+            "idx_alert_inbox_unread",
+            "user_id",
+            postgresql_where=text("read_at IS NULL AND NOT stale"),
+        ),
+    )
@@ -16,6 +16,8 @@ class Incident(Base):
     photo_url = Column(String, nullable=True)
     geom = Column(Geometry("POINT", srid=4326), nullable=False)
     public_geom = Column(Geometry("POINT", srid=4326), nullable=False)
+    # Assigned once on insert from the exact location (point-in-polygon)
+    neighborhood_id = Column(Integer, ForeignKey("neighborhoods.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=True)
 
@@ -23,6 +25,7 @@ class Incident(Base):
         Index("idx_incidents_geom", geom, postgresql_using="gist"),
         Index("idx_incidents_public_geom", public_geom, postgresql_using="gist"),
         Index("idx_incidents_status_type", status, type),
+        Index("idx_incidents_neighborhood_created", neighborhood_id, created_at),
     )
 
 
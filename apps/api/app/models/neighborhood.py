@@ -0,0 +1,22 @@
+"""Neighborhood boundaries, loaded with scripts/load_neighborhoods.py."""
+
+from sqlalchemy import Column, Integer, String, DateTime, func, Index, UniqueConstraint
+from geoalchemy2 import Geometry
+
+from app.core.database import Base
+
+
+class Neighborhood(Base):
+    __tablename__ = "neighborhoods"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    city = Column(String, nullable=False, default="")
+    geom = Column(Geometry("MULTIPOLYGON", srid=4326), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("city", "name", name="uq_neighborhoods_city_name"),
+        Index("idx_neighborhoods_geom", geom, postgresql_using="gist"),
+        Index("idx_neighborhoods_name_lower", func.lower(name)),
+    )
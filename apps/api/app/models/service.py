@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func, ARRAY, Text
-from geoalchemy2 import Geometry
+from sqlalchemy import Column, Computed, Integer, String, DateTime, ForeignKey, Index, cast, func, text, ARRAY, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
+from geoalchemy2 import Geography, Geometry
 
 from app.core.database import Base
 
@@ -20,3 +22,37 @@ class Service(Base):
     images = Column(ARRAY(String), default=[])
     status = Column(String, default="pending")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # pt_unaccent: portuguese stemming over unaccented words (see migration f1c6a8e3b940)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('pt_unaccent', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('pt_unaccent', coalesce(category, '')), 'B') || "
+            "setweight(to_tsvector('pt_unaccent', coalesce(description, '')), 'C')",
+            persisted=True,
+        ),
+    ))
+
+    __table_args__ = (
+        Index("idx_services_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "idx_services_name_trgm",
+            func.f_unaccent(func.lower(name)).label("name_unaccent"),
+            postgresql_using="gin",
+            postgresql_ops={"name_unaccent": "gin_trgm_ops"},
+        ),
+        # Radius filters and nearest-first (KNN) listing
+        Index(
+            "idx_services_geog_approved",
+            cast(geom, Geography),
+            postgresql_using="gist",
+            postgresql_where=text("status = 'approved'"),
+        ),
+        # Moderation queue, oldest first
+        Index(
+            "idx_services_pending_created",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
@@ -10,6 +10,7 @@ from app.schemas.enums import IncidentType, Severity
 class AlertPreferenceCreate(BaseModel):
     mode: str = Field(..., pattern="^(radius|neighborhood)$")
     neighborhood_name: str | None = Field(None, max_length=200)
+    neighborhood_id: int | None = None
     center_lat: float | None = Field(None, ge=-90, le=90)
     center_lon: float | None = Field(None, ge=-180, le=180)
     radius_km: float | None = Field(None, ge=0.1, le=50)
@@ -23,6 +24,7 @@ class AlertPreferenceResponse(BaseModel):
     user_id: int
     mode: str
     neighborhood_name: str | None = None
+    neighborhood_id: int | None = None
     center_lat: float | None = None
     center_lon: float | None = None
     radius_km: float | None = None
@@ -38,5 +40,16 @@ class AlertFeedItem(BaseModel):
     description: str | None = None
     lat: float
     lon: float
-    distance_km: float
+    distance_km: float | None = None  # None for neighborhood matches
+    neighborhood_id: int | None = None
     created_at: datetime
+    read: bool = False
+    stale: bool = False  # incident resolved or disputed since it was delivered
+
+
+class AlertReadRequest(BaseModel):
+    incident_ids: list[int] | None = Field(None, max_length=500)  # None marks everything read
+
+
+class AlertUnreadCount(BaseModel):
+    unread: int
@@ -53,6 +53,26 @@ class RouteProfile(str, Enum):
     foot_walking = "foot-walking"
 
 
+class CommuteDirection(str, Enum):
+    to_work = "to_work"
+    to_home = "to_home"
+
+
+class ServiceSort(str, Enum):
+    featured = "featured"  # business plan first (or search relevance), then newest
+    nearest = "nearest"
+
+
+class GeometryFormat(str, Enum):
+    geojson = "geojson"
+    polyline6 = "polyline6"
+
+
+class RouteMode(str, Enum):
+    fastest = "fastest"
+    safest = "safest"
+
+
 # Incident types that require extra privacy (geo fuzzing)
 SENSITIVE_INCIDENT_TYPES = {
     IncidentType.tiroteio,
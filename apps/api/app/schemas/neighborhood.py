@@ -0,0 +1,19 @@
+"""Neighborhood lookup and statistics schemas."""
+
+from pydantic import BaseModel
+
+
+class NeighborhoodResponse(BaseModel):
+    id: int
+    name: str
+    city: str
+
+
+class NeighborhoodStats(BaseModel):
+    neighborhood_id: int
+    name: str
+    days: int
+    total: int
+    open: int
+    by_type: dict[str, int]
+    by_severity: dict[str, int]
@@ -0,0 +1,54 @@
+"""Web push subscription schemas (shape of the browser's PushSubscription.toJSON())."""
+
+import base64
+import binascii
+from datetime import datetime
+
+from cryptography.hazmat.primitives.asymmetric import ec
+from pydantic import BaseModel, Field, field_validator
+
+
+def _b64url_decode(value: str) -> bytes:
+    try:
+        return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    except (binascii.Error, ValueError):
+        raise ValueError("must be base64url encoded") from None
+
+
+class PushKeys(BaseModel):
+    p256dh: str = Field(..., min_length=1, max_length=200)
+    auth: str = Field(..., min_length=1, max_length=100)
+
+    @field_validator("p256dh")
+    @classmethod
+    def p256dh_must_be_p256_point(cls, v: str) -> str:
+        point = _b64url_decode(v)
+        try:
+            if len(point) != 65 or point[0] != 4:
+                raise ValueError
+            ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), point)
+        except ValueError:
+            raise ValueError("p256dh must be an uncompressed P-256 public key, base64url encoded") from None
+        return v
+
+    @field_validator("auth")
+    @classmethod
+    def auth_must_be_16_bytes(cls, v: str) -> str:
+        if len(_b64url_decode(v)) != 16:
+            raise ValueError("auth must be a 16-byte secret, base64url encoded")
+        return v
+
+
+class PushSubscriptionCreate(BaseModel):
+    endpoint: str = Field(..., pattern="^https://", max_length=2048)
+    keys: PushKeys
+
+
+class PushSubscriptionResponse(BaseModel):
+    id: int
+    endpoint: str
+    created_at: datetime
+
+
+class VapidKeyResponse(BaseModel):
+    public_key: str
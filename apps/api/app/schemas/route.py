@@ -4,11 +4,15 @@ from typing import Any
 
 from pydantic import BaseModel, Field
 
-from app.schemas.enums import RouteProfile
+from app.schemas.enums import CommuteDirection, GeometryFormat, RouteMode, RouteProfile
 
 
 class CommuteRequest(BaseModel):
     profile: RouteProfile = RouteProfile.driving_car
+    mode: RouteMode = RouteMode.fastest
+    direction: CommuteDirection = CommuteDirection.to_work
+    geometry_format: GeometryFormat = GeometryFormat.geojson
+    zoom: int | None = Field(None, ge=0, le=22)
 
 
 class CustomRouteRequest(BaseModel):
@@ -17,6 +21,9 @@ class CustomRouteRequest(BaseModel):
     dest_lat: float = Field(..., ge=-90, le=90)
     dest_lon: float = Field(..., ge=-180, le=180)
     profile: RouteProfile = RouteProfile.driving_car
+    mode: RouteMode = RouteMode.fastest
+    geometry_format: GeometryFormat = GeometryFormat.geojson
+    zoom: int | None = Field(None, ge=0, le=22)
 
 
 class RouteResponse(BaseModel):
@@ -29,3 +36,28 @@ class RouteResponse(BaseModel):
 
 class RouteAlternative(BaseModel):
     routes: list[RouteResponse]
+
+
+class MatrixPoint(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class RouteMatrixRequest(BaseModel):
+    origins: list[MatrixPoint] = Field(..., min_length=1, max_length=50)
+    destinations: list[MatrixPoint] = Field(..., min_length=1, max_length=50)
+    profile: RouteProfile = RouteProfile.driving_car
+
+
+class RouteMatrixResponse(BaseModel):
+    """Provider durations/distances per pair, plus an approximate risk.
+
+    Matrix providers return no geometry, so ``straight_line_risk_scores``
+    counts open incidents near the straight origin->destination segment. It
+    can differ from ``risk_score`` of ``/routes/calculate``, which scores
+    the routed street geometry.
+    """
+
+    durations: list[list[float | None]]
+    distances: list[list[float | None]]
+    straight_line_risk_scores: list[list[float]]
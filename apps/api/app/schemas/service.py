@@ -32,6 +32,7 @@ class ServiceResponse(BaseModel):
     status: str
     plan_level: str
     created_at: datetime
+    distance_m: float | None = None  # from the search point, on list results
 
 
 class ServiceUpdate(BaseModel):
@@ -48,4 +49,13 @@ class ServiceUpdate(BaseModel):
 
 class ServiceListResponse(BaseModel):
     services: list[ServiceResponse]
-    total: int
+    total: int | None = None  # None for nearest-first queries without a radius
+
+
+class ServiceModerationRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=500)
+
+
+class ServiceModerationResponse(BaseModel):
+    services: list[ServiceResponse]
+    missing: list[int]  # requested IDs that do not exist
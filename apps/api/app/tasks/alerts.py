@@ -0,0 +1,166 @@
+"""Reverse matching: from a newly reported incident to the users watching it."""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.tasks.celery_app import celery
+from app.tasks.push import queue_notifications
+
+logger = logging.getLogger(__name__)
+
+_engine = None
+
+_PREFERENCE_FILTERS = """
+      p.enabled
+      AND p.user_id <> i.user_id
+      AND (p.types IS NULL OR i.type = ANY(p.types))
+      AND CASE i.severity WHEN 'alta' THEN 3 WHEN 'media' THEN 2 ELSE 1 END
+          >= CASE p.min_severity WHEN 'alta' THEN 3 WHEN 'media' THEN 2 ELSE 1 END
+"""
+
+# Radius preferences go through the GiST index on alert_preferences.area
+# (then the exact radius check on the few candidates); neighborhood
+# preferences are an equality lookup on the incident's precomputed
+# neighborhood_id. Neither grows linearly with the number of preferences.
+# Matches are written to each user's alert_inbox in the same statement; only
+# newly inserted rows are returned, so a retried task does not notify twice.
+_MATCH_SQL = text(
+    f"""
+    WITH i AS (
+        SELECT id, user_id, type, severity, public_geom, neighborhood_id, created_at
+        FROM incidents
+        WHERE id = :incident_id AND status = 'open'
+    ),
+    matched AS (
+        SELECT p.user_id,
+               ST_Distance(p.center_geom::geography, i.public_geom::geography) AS distance_m
+        FROM i
+        JOIN alert_preferences p ON ST_Intersects(p.area, i.public_geom)
+        WHERE p.mode = 'radius'
+          AND ST_DWithin(p.center_geom::geography, i.public_geom::geography, p.radius_km * 1000)
+          AND {_PREFERENCE_FILTERS}
+        UNION ALL
+        SELECT p.user_id, NULL::float AS distance_m
+        FROM i
+        JOIN alert_preferences p ON p.neighborhood_id = i.neighborhood_id
+        WHERE p.mode = 'neighborhood'
+          AND {_PREFERENCE_FILTERS}
+    )
+    INSERT INTO alert_inbox (user_id, incident_id, distance_m, created_at)
+    SELECT m.user_id, i.id, min(m.distance_m), i.created_at
+    FROM matched m CROSS JOIN i
+    GROUP BY m.user_id, i.id, i.created_at
+    ON CONFLICT (user_id, incident_id) DO NOTHING
+    RETURNING user_id
+    """
+)
+
+# Age trim, one batch per transaction, through idx_alert_inbox_created
+_TRIM_AGE_SQL = text(
+    """
+    DELETE FROM alert_inbox
+    WHERE (user_id, incident_id) IN (
+        SELECT user_id, incident_id FROM alert_inbox
+        WHERE created_at < :cutoff
+        LIMIT :batch
+    )
+    """
+)
+
+# Only users who got entries recently can have grown past the cap; each
+# count stops at max_items + 1 rows of idx_alert_inbox_user_created
+_OVER_CAP_SQL = text(
+    """
+    SELECT recent.user_id
+    FROM (SELECT DISTINCT user_id FROM alert_inbox WHERE created_at >= :since) recent
+    CROSS JOIN LATERAL (
+        SELECT count(*) AS n
+        FROM (SELECT 1 FROM alert_inbox a WHERE a.user_id = recent.user_id LIMIT :max_items + 1) capped
+    ) c
+    WHERE c.n > :max_items
+    """
+)
+
+# Everything older than the user's newest max_items entries
+_TRIM_USER_SQL = text(
+    """
+    DELETE FROM alert_inbox a
+    USING (
+        SELECT created_at, incident_id FROM alert_inbox
+        WHERE user_id = :user_id
+        ORDER BY created_at DESC, incident_id DESC
+        OFFSET :max_items LIMIT 1
+    ) edge
+    WHERE a.user_id = :user_id
+      AND (a.created_at, a.incident_id) <= (edge.created_at, edge.incident_id)
+    """
+)
+
+_INCIDENT_SQL = text("SELECT type, severity FROM incidents WHERE id = :incident_id")
+
+
+def _get_engine():
+    # Created lazily so each forked worker process gets its own pool
+    global _engine
+    if _engine is None:
+        _engine = create_engine(settings.DATABASE_URL_SYNC, pool_pre_ping=True)
+    return _engine
+
+
+def match_subscribers(incident_id: int) -> list[int]:
+    """Add the incident to matching users' inboxes; return the users newly added."""
+    with _get_engine().begin() as conn:
+        rows = conn.execute(_MATCH_SQL, {"incident_id": incident_id})
+        return [row.user_id for row in rows]
+
+
+@celery.task
+def notify_incident_subscribers(incident_id: int):
+    """Fan a new incident out to subscribers' inboxes and queue their push notifications."""
+    with _get_engine().connect() as conn:
+        incident = conn.execute(_INCIDENT_SQL, {"incident_id": incident_id}).first()
+    if incident is None:
+        return {"matched": 0}
+
+    user_ids = match_subscribers(incident_id)
+    title = f"Alerta: {incident.type.replace('_', ' ')}"
+    body = f"Novo incidente de gravidade {incident.severity} perto de voce"
+    queue_notifications(user_ids, title, body)
+
+    if user_ids:
+        logger.info("Incident %d matched %d subscribers", incident_id, len(user_ids))
+    return {"matched": len(user_ids)}
+
+
+@celery.task
+def trim_alert_inbox():
+    """Bound every inbox by age and size, in short transactions."""
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=settings.ALERT_INBOX_MAX_AGE_DAYS)
+    batch = settings.ALERT_INBOX_TRIM_BATCH_SIZE
+    engine = _get_engine()
+
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            count = conn.execute(_TRIM_AGE_SQL, {"cutoff": cutoff, "batch": batch}).rowcount
+        deleted += count
+        if count < batch:
+            break
+
+    # Entries carry the incident's creation time; backfills reach back
+    # ALERT_INBOX_BACKFILL_DAYS, and the task runs hourly
+    since = now - timedelta(days=settings.ALERT_INBOX_BACKFILL_DAYS, hours=2)
+    max_items = settings.ALERT_INBOX_MAX_ITEMS
+    with engine.connect() as conn:
+        over_cap = conn.execute(_OVER_CAP_SQL, {"since": since, "max_items": max_items}).scalars().all()
+    for user_id in over_cap:
+        with engine.begin() as conn:
+            deleted += conn.execute(_TRIM_USER_SQL, {"user_id": user_id, "max_items": max_items}).rowcount
+
+    if deleted:
+        logger.info("Trimmed %d alert inbox entries (%d users over the cap)", deleted, len(over_cap))
+    return {"deleted": deleted, "over_cap": len(over_cap)}
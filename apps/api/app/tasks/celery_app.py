@@ -1,11 +1,16 @@
+import asyncio
 import logging
+from collections.abc import Coroutine
 from datetime import datetime, timezone
+from typing import Any
 
 from celery import Celery
 from celery.schedules import crontab
 from sqlalchemy import create_engine, text
 
 from app.core.config import settings
+from app.core.database import engine
+from app.core.redis import disconnect_pools
 
 logger = logging.getLogger(__name__)
 
@@ -13,13 +18,14 @@ celery = Celery(
     "urban_tasks",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
+    include=["app.tasks.alerts", "app.tasks.commute", "app.tasks.push"],
 )
 
 celery.conf.update(
     task_serializer="json",
     accept_content=["json"],
     result_serializer="json",
-    timezone="America/Sao_Paulo",
+    timezone=settings.APP_TIMEZONE,
     enable_utc=True,
 )
 
@@ -28,31 +34,59 @@ celery.conf.beat_schedule = {
         "task": "app.tasks.celery_app.expire_old_incidents",
         "schedule": crontab(minute="*/5"),
     },
+    "precompute-commute-routes": {
+        "task": "app.tasks.commute.precompute_commute_routes",
+        "schedule": crontab(minute=str((60 - settings.COMMUTE_PRECOMPUTE_LEAD_MIN) % 60)),
+    },
+    "trim-alert-inbox": {
+        "task": "app.tasks.alerts.trim_alert_inbox",
+        "schedule": crontab(minute="17"),
+    },
+    "drain-push-queue": {
+        "task": "app.tasks.push.drain_push_queue",
+        "schedule": settings.PUSH_DRAIN_INTERVAL_SECONDS,
+    },
 }
 
 
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine from a (sync) Celery task.
+
+    Each call gets a fresh event loop, so the async DB engine and Redis pool
+    are released afterwards instead of leaking loop-bound connections.
+    """
+    async def _runner():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+            await disconnect_pools()
+
+    return asyncio.run(_runner())
+
+
 @celery.task
 def expire_old_incidents():
-    """Mark incidents past their expires_at as resolved."""
+    """Mark incidents past their expires_at as resolved (and stale in alert inboxes)."""
     engine = create_engine(settings.DATABASE_URL_SYNC)
     now = datetime.now(timezone.utc)
     with engine.connect() as conn:
         result = conn.execute(
             text(
-                "UPDATE incidents SET status = 'resolved' "
-                "WHERE status = 'open' AND expires_at IS NOT NULL AND expires_at <= :now"
+                "WITH expired AS ("
+                "  UPDATE incidents SET status = 'resolved' "
+                "  WHERE status = 'open' AND expires_at IS NOT NULL AND expires_at <= :now "
+                "  RETURNING id"
+                "), inbox AS ("
+                "  UPDATE alert_inbox SET stale = true WHERE incident_id IN (SELECT id FROM expired)"
+                ") "
+                "SELECT count(*) FROM expired"
             ),
             {"now": now},
         )
+        count = result.scalar() or 0
         conn.commit()
-        count = result.rowcount
     engine.dispose()
     if count > 0:
         logger.info("Expired %d incidents", count)
     return {"expired": count}
-
-
-@celery.task
-def send_push_notification(user_id: int, title: str, body: str):
-    """Send a push notification to the given user."""
-    pass
@@ -0,0 +1,126 @@
+"""Commute route precomputation ahead of each user's usual departure time."""
+
+import logging
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException
+
+from app.api.v1.endpoints.routes import (
+    commute_cache_key,
+    commute_cache_tag,
+    commute_prefs_key,
+    commute_slot_key,
+    compute_commute_route,
+)
+from app.core.config import settings
+from app.core.database import async_session_factory
+from app.core.cache import cache_set
+from app.core.redis import redis_batch, redis_client
+from app.schemas.enums import CommuteDirection, RouteMode, RouteProfile
+from app.tasks.celery_app import celery, run_async
+from app.tasks.push import send_push_notification
+
+logger = logging.getLogger(__name__)
+
+# Last risk score pushed to the user, kept across days to detect changes
+_RISK_TTL = 2 * 86400
+
+_DIRECTION_LABELS = {
+    CommuteDirection.to_work.value: "trabalho",
+    CommuteDirection.to_home.value: "casa",
+}
+
+
+@celery.task
+def precompute_commute_routes():
+    """Find users who usually leave in the upcoming hour and fan their routes out to batch tasks."""
+    return run_async(_precompute_commute_routes())
+
+
+async def _precompute_commute_routes() -> dict:
+    now = datetime.now(ZoneInfo(settings.APP_TIMEZONE))
+    slot = (now + timedelta(minutes=settings.COMMUTE_PRECOMPUTE_LEAD_MIN)).hour
+    # Slot history is recorded per local day; count the days each user showed up
+    days = [now.date() - timedelta(days=d) for d in range(settings.COMMUTE_HISTORY_DAYS)]
+
+    users = 0
+    batches = 0
+    size = settings.COMMUTE_PRECOMPUTE_BATCH_SIZE
+    for direction in CommuteDirection:
+        counts = await redis_client.zunion(
+            [commute_slot_key(direction.value, slot, day) for day in days], withscores=True
+        )
+        user_ids = [int(raw_id) for raw_id, days_seen in counts if days_seen >= settings.COMMUTE_MIN_DEPARTURES]
+        for start in range(0, len(user_ids), size):
+            precompute_commute_batch.delay(direction.value, slot, user_ids[start:start + size])
+            batches += 1
+        users += len(user_ids)
+
+    return {"slot": slot, "users": users, "batches": batches}
+
+
+@celery.task
+def precompute_commute_batch(direction: str, slot: int, user_ids: list[int]):
+    """Warm commute caches for one batch of users leaving in ``slot``."""
+    return run_async(_precompute_commute_batch(direction, slot, user_ids))
+
+
+async def _precompute_commute_batch(direction: str, slot: int, user_ids: list[int]) -> dict:
+    warmed = 0
+    notified = 0
+    # One round trip for every user's route preferences in this batch
+    async with redis_batch() as batch:
+        pending_prefs = [batch.hget(commute_prefs_key(user_id), direction) for user_id in user_ids]
+
+    async with async_session_factory() as db:
+        for user_id, pref in zip(user_ids, pending_prefs):
+            prefs = pref.result()
+            profile, mode = (
+                prefs.split("|", 1) if prefs
+                else (RouteProfile.driving_car.value, RouteMode.fastest.value)
+            )
+
+            try:
+                result = await compute_commute_route(db, user_id, direction, profile, mode)
+            except HTTPException:
+                logger.warning("Commute precompute failed for user %d", user_id)
+                continue
+            if result is None:
+                continue
+
+            await cache_set(
+                commute_cache_key(user_id, direction, profile, mode),
+                result.model_dump(),
+                ttl=settings.COMMUTE_CACHE_TTL,
+                tags=(commute_cache_tag(user_id),),
+            )
+            warmed += 1
+
+            if await _risk_changed(user_id, direction, result.routes[0].risk_score):
+                send_push_notification.delay(
+                    user_id,
+                    f"Rota para {_DIRECTION_LABELS[direction]}",
+                    _risk_message(result.routes[0].risk_score,
+                                  len(result.routes[0].incidents_on_route)),
+                )
+                notified += 1
+
+    if warmed:
+        logger.info("Precomputed %d commute routes (%s) for slot %02d:00", warmed, direction, slot)
+    return {"slot": slot, "warmed": warmed, "notified": notified}
+
+
+async def _risk_changed(user_id: int, direction: str, risk_score: float) -> bool:
+    """Store the latest risk and report whether it moved enough to notify."""
+    key = f"commute:risk:{user_id}:{direction}"
+    previous = await redis_client.set(key, risk_score, ex=_RISK_TTL, get=True)
+    if previous is None:
+        return False
+    return abs(float(previous) - risk_score) >= settings.COMMUTE_RISK_ALERT_DELTA
+
+
+def _risk_message(risk_score: float, incident_count: int) -> str:
+    if incident_count == 0:
+        return "Sem ocorrencias no seu trajeto de hoje."
+    return f"{incident_count} ocorrencia(s) no seu trajeto. Risco atual: {int(risk_score * 100)}%."
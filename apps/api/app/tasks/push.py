@@ -0,0 +1,245 @@
+"""Web push delivery: per-user coalescing, batched drains, dead endpoint pruning.
+
+Notifications are not sent from the task that produces them. They are
+appended to a per-user pending list and the user is put on a due queue
+(a Redis sorted set scored by the earliest time they may be pushed).
+``drain_push_queue`` claims due users in batches, folds each user's pending
+messages into one digest, and sends to all their devices through a bounded
+thread pool. Subscriptions the push service reports gone, or whose keys are
+unusable, are deleted. After a push a user is on cooldown for
+``PUSH_USER_WINDOW_SECONDS``; anything queued meanwhile waits for the next
+digest instead of producing another notification.
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+import requests
+from py_vapid import Vapid
+from pywebpush import WebPushException, webpush
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.core.metrics import SharedCounter
+from app.tasks.celery_app import celery
+
+logger = logging.getLogger(__name__)
+
+push_notifications = SharedCounter(
+    "push_notifications_total",
+    "Web push pipeline events (queued, coalesced, delivered, expired, invalid, failed, no_device)",
+    "outcome",
+)
+
+_DUE_KEY = "push:due"
+_COOLDOWN_KEY = "push:cooldown"
+_KICK_KEY = "push:kick"
+_MAX_PENDING = 20  # older messages beyond this are dropped from the digest
+_PENDING_TTL = 86400
+
+# Atomically take up to ARGV[2] users whose due time is <= ARGV[1], so
+# concurrent drain tasks never claim the same user
+_CLAIM_DUE = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #ids > 0 then
+    redis.call('ZREM', KEYS[1], unpack(ids))
+end
+return ids
+"""
+
+_SUBSCRIPTIONS_SQL = text(
+    "SELECT id, user_id, endpoint, p256dh, auth FROM push_subscriptions WHERE user_id = ANY(:user_ids)"
+)
+_PRUNE_SQL = text("DELETE FROM push_subscriptions WHERE id = ANY(:ids)")
+
+# Per-process resources, created lazily so each forked worker gets its own
+_lock = threading.Lock()
+_redis: redis.Redis | None = None
+_engine = None
+_executor: ThreadPoolExecutor | None = None
+_vapid: Vapid | None = None
+_local = threading.local()
+
+
+def _pending_key(user_id: int) -> str:
+    return f"push:pending:{user_id}"
+
+
+def _get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis
+
+
+def _get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(settings.DATABASE_URL_SYNC, pool_pre_ping=True)
+    return _engine
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _vapid
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.PUSH_CONCURRENCY, thread_name_prefix="webpush")
+            _vapid = Vapid.from_string(settings.VAPID_PRIVATE_KEY)
+    return _executor
+
+
+def _session() -> requests.Session:
+    # One keep-alive session per delivery thread: most endpoints share a handful of push hosts
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def queue_notifications(user_ids: list[int], title: str, body: str) -> None:
+    """Queue a notification for each user; delivery happens in ``drain_push_queue``.
+
+    Without VAPID keys nothing drains the queue, so nothing is queued.
+    """
+    if not user_ids or not settings.VAPID_PRIVATE_KEY:
+        return
+    client = _get_redis()
+    message = json.dumps({"title": title, "body": body})
+    pipe = client.pipeline(transaction=False)
+    for user_id in user_ids:
+        key = _pending_key(user_id)
+        pipe.rpush(key, message)
+        pipe.ltrim(key, -_MAX_PENDING, -1)
+        pipe.expire(key, _PENDING_TTL)
+    # NX keeps an existing (possibly deferred) due time
+    pipe.zadd(_DUE_KEY, {str(user_id): time.time() for user_id in user_ids}, nx=True)
+    push_notifications.inc(pipe, "queued", len(user_ids))
+    pipe.execute()
+
+    # Collapse bursts of producers into a single immediate drain
+    if client.set(_KICK_KEY, 1, nx=True, px=500):
+        drain_push_queue.delay()
+
+
+@celery.task
+def send_push_notification(user_id: int, title: str, body: str):
+    """Send a push notification to the given user (coalesced with others pending)."""
+    queue_notifications([user_id], title, body)
+
+
+def _digest(messages: list[dict]) -> str:
+    if len(messages) == 1:
+        payload = {"title": messages[0]["title"], "body": messages[0]["body"], "count": 1}
+    else:
+        titles = list(dict.fromkeys(m["title"] for m in messages))
+        payload = {
+            "title": f"{len(messages)} novos alertas",
+            "body": "; ".join(titles[:3]) + (" e mais" if len(titles) > 3 else ""),
+            "count": len(messages),
+        }
+    payload["tag"] = "alerts"
+    return json.dumps(payload)
+
+
+def _deliver(subscription, payload: str) -> str:
+    try:
+        webpush(
+            subscription_info={
+                "endpoint": subscription.endpoint,
+                "keys": {"p256dh": subscription.p256dh, "auth": subscription.auth},
+            },
+            data=payload,
+            vapid_private_key=_vapid,
+            vapid_claims={"sub": settings.VAPID_SUBJECT},
+            ttl=settings.PUSH_TTL_SECONDS,
+            timeout=settings.PUSH_TIMEOUT_SECONDS,
+            requests_session=_session(),
+        )
+        return "delivered"
+    except WebPushException as exc:
+        code = exc.response.status_code if exc.response is not None else None
+        if code in (404, 410):
+            return "expired"
+        logger.warning("Push to subscription %d failed with status %s", subscription.id, code)
+        return "failed"
+    except requests.RequestException:
+        logger.warning("Push to subscription %d failed", subscription.id, exc_info=True)
+        return "failed"
+    except ValueError:
+        # Unusable keys (bad base64, not a P-256 point); binascii.Error is a ValueError
+        logger.warning("Push subscription %d has invalid keys", subscription.id, exc_info=True)
+        return "invalid"
+    except Exception:
+        # Never let one subscription fail the batch: its pending lists are already consumed
+        logger.exception("Push to subscription %d failed", subscription.id)
+        return "failed"
+
+
+@celery.task
+def drain_push_queue():
+    """Deliver digests to one batch of due users; re-enqueues itself while work remains."""
+    if not settings.VAPID_PRIVATE_KEY:
+        return {"users": 0}
+
+    client = _get_redis()
+    now = time.time()
+    claimed = [int(u) for u in client.eval(_CLAIM_DUE, 1, _DUE_KEY, now, settings.PUSH_BATCH_SIZE)]
+    if not claimed:
+        return {"users": 0}
+    if len(claimed) == settings.PUSH_BATCH_SIZE:
+        # Let other workers pick up the next batch in parallel
+        drain_push_queue.delay()
+
+    client.zremrangebyscore(_COOLDOWN_KEY, "-inf", now)
+    cooldowns = client.zmscore(_COOLDOWN_KEY, claimed)
+    ready = [uid for uid, until in zip(claimed, cooldowns) if until is None]
+    deferred = {str(uid): until for uid, until in zip(claimed, cooldowns) if until is not None}
+    if deferred:
+        # GT: never pull a due time earlier than the cooldown allows
+        client.zadd(_DUE_KEY, deferred, gt=True)
+    if not ready:
+        return {"users": 0, "deferred": len(deferred)}
+
+    pipe = client.pipeline(transaction=True)
+    for uid in ready:
+        pipe.lrange(_pending_key(uid), 0, -1)
+        pipe.delete(_pending_key(uid))
+    results = pipe.execute()
+    messages = {
+        uid: [json.loads(m) for m in raw]
+        for uid, raw in zip(ready, results[::2])
+        if raw
+    }
+    if not messages:
+        return {"users": 0, "deferred": len(deferred)}
+
+    with _get_engine().connect() as conn:
+        subscriptions = conn.execute(_SUBSCRIPTIONS_SQL, {"user_ids": list(messages)}).all()
+
+    payloads = {uid: _digest(msgs) for uid, msgs in messages.items()}
+    executor = _get_executor()
+    outcomes = list(executor.map(lambda s: _deliver(s, payloads[s.user_id]), subscriptions))
+
+    prune = [s.id for s, outcome in zip(subscriptions, outcomes) if outcome in ("expired", "invalid")]
+    if prune:
+        with _get_engine().begin() as conn:
+            conn.execute(_PRUNE_SQL, {"ids": prune})
+
+    counts: dict[str, int] = {}
+    for outcome in outcomes:
+        counts[outcome] = counts.get(outcome, 0) + 1
+    counts["coalesced"] = sum(len(msgs) - 1 for msgs in messages.values())
+    counts["no_device"] = len(set(messages) - {s.user_id for s in subscriptions})
+
+    pipe = client.pipeline(transaction=False)
+    pipe.zadd(_COOLDOWN_KEY, {str(uid): now + settings.PUSH_USER_WINDOW_SECONDS for uid in messages})
+    for outcome, count in counts.items():
+        if count:
+            push_notifications.inc(pipe, outcome, count)
+    pipe.execute()
+
+    logger.info("Push drain: %d users, %d devices, %s", len(messages), len(subscriptions), counts)
+    return {"users": len(messages), "devices": len(subscriptions), "deferred": len(deferred), **counts}
@@ -0,0 +1,28 @@
+"""services_geography_knn_index
+
+Revision ID: 0a9e5b7c4d21
+Revises: f1c6a8e3b940
+Create Date: 2026-10-19 15:48:33.402187
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '0a9e5b7c4d21'
+down_revision: Union[str, None] = 'f1c6a8e3b940'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Geography expression index: serves ST_DWithin on geom::geography and
+    # index-ordered KNN (geom::geography <-> point) over approved listings
+    op.execute(
+        "CREATE INDEX idx_services_geog_approved ON services "
+        "USING gist ((geom::geography)) WHERE status = 'approved'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_services_geog_approved', table_name='services')
@@ -0,0 +1,30 @@
+"""services_moderation_queue_index
+
+Revision ID: 3d7f2b9e6a14
+Revises: 0a9e5b7c4d21
+Create Date: 2026-10-19 16:21:07.518394
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3d7f2b9e6a14'
+down_revision: Union[str, None] = '0a9e5b7c4d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_services_pending_created',
+        'services',
+        ['created_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_services_pending_created', table_name='services')
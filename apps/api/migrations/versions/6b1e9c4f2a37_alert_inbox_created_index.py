@@ -0,0 +1,23 @@
+"""alert_inbox_created_index
+
+Revision ID: 6b1e9c4f2a37
+Revises: 3d7f2b9e6a14
+Create Date: 2026-10-19 18:42:13.204117
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '6b1e9c4f2a37'
+down_revision: Union[str, None] = '3d7f2b9e6a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_alert_inbox_created', 'alert_inbox', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_alert_inbox_created', table_name='alert_inbox')
@@ -0,0 +1,33 @@
+"""alert_preference_areas
+
+Revision ID: 7c1e9a4d2b63
+Revises: 4dbad181bc5e
+Create Date: 2026-10-19 09:12:41.503118
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+
+
+revision: str = '7c1e9a4d2b63'
+down_revision: Union[str, None] = '4dbad181bc5e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('alert_preferences', sa.Column('area', geoalchemy2.types.Geometry(geometry_type='POLYGON', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True))
+    # Same padded buffer as app.api.v1.endpoints.alerts.preference_area
+    op.execute(
+        "UPDATE alert_preferences "
+        "SET area = ST_Buffer(center_geom::geography, radius_km * 1000 * 1.01)::geometry "
+        "WHERE mode = 'radius' AND center_geom IS NOT NULL AND radius_km IS NOT NULL"
+    )
+    op.create_index('idx_alert_preferences_area', 'alert_preferences', ['area'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.drop_index('idx_alert_preferences_area', table_name='alert_preferences', postgresql_using='gist')
+    op.drop_column('alert_preferences', 'area')
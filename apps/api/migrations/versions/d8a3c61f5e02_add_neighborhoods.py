@@ -0,0 +1,55 @@
+"""add_neighborhoods
+
+Revision ID: d8a3c61f5e02
+Revises: b52f0e8c3a17
+Create Date: 2026-10-19 11:21:08.915730
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+
+
+revision: str = 'd8a3c61f5e02'
+down_revision: Union[str, None] = 'b52f0e8c3a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('neighborhoods',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('city', sa.String(), nullable=False, server_default=''),
+    sa.Column('geom', geoalchemy2.types.Geometry(geometry_type='MULTIPOLYGON', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry', nullable=False), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('city', 'name', name='uq_neighborhoods_city_name')
+    )
+    op.create_index(op.f('ix_neighborhoods_id'), 'neighborhoods', ['id'], unique=False)
+    op.create_index('idx_neighborhoods_geom', 'neighborhoods', ['geom'], unique=False, postgresql_using='gist')
+    op.create_index('idx_neighborhoods_name_lower', 'neighborhoods', [sa.text('lower(name)')], unique=False)
+
+    op.add_column('incidents', sa.Column('neighborhood_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_incidents_neighborhood_id', 'incidents', 'neighborhoods', ['neighborhood_id'], ['id'], ondelete='SET NULL')
+    op.create_index('idx_incidents_neighborhood_created', 'incidents', ['neighborhood_id', 'created_at'], unique=False)
+
+    op.add_column('alert_preferences', sa.Column('neighborhood_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_alert_preferences_neighborhood_id', 'alert_preferences', 'neighborhoods', ['neighborhood_id'], ['id'], ondelete='CASCADE')
+    op.create_index(op.f('ix_alert_preferences_neighborhood_id'), 'alert_preferences', ['neighborhood_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_alert_preferences_neighborhood_id'), table_name='alert_preferences')
+    op.drop_constraint('fk_alert_preferences_neighborhood_id', 'alert_preferences', type_='foreignkey')
+    op.drop_column('alert_preferences', 'neighborhood_id')
+
+    op.drop_index('idx_incidents_neighborhood_created', table_name='incidents')
+    op.drop_constraint('fk_incidents_neighborhood_id', 'incidents', type_='foreignkey')
+    op.drop_column('incidents', 'neighborhood_id')
+
+    op.drop_index('idx_neighborhoods_name_lower', table_name='neighborhoods')
+    op.drop_index('idx_neighborhoods_geom', table_name='neighborhoods', postgresql_using='gist')
+    op.drop_index(op.f('ix_neighborhoods_id'), table_name='neighborhoods')
+    op.drop_table('neighborhoods')
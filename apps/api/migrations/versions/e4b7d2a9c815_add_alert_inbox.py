@@ -0,0 +1,62 @@
+"""add_alert_inbox
+
+Revision ID: e4b7d2a9c815
+Revises: d8a3c61f5e02
+Create Date: 2026-10-19 13:40:52.118604
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+
+
+revision: str = 'e4b7d2a9c815'
+down_revision: Union[str, None] = 'd8a3c61f5e02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('alert_inbox',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('incident_id', sa.Integer(), nullable=False),
+    sa.Column('distance_m', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('delivered_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('read_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('stale', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.ForeignKeyConstraint(['incident_id'], ['incidents.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'incident_id')
+    )
+    op.create_index('idx_alert_inbox_user_created', 'alert_inbox', ['user_id', 'created_at', 'incident_id'], unique=False)
+    op.create_index('idx_alert_inbox_unread', 'alert_inbox', ['user_id'], unique=False, postgresql_where=sa.text('read_at IS NULL AND NOT stale'))
+
+    # Seed inboxes with the currently open incidents matching each enabled preference
+    op.execute(
+        """
+        INSERT INTO alert_inbox (user_id, incident_id, distance_m, created_at)
+        SELECT p.user_id, i.id,
+               min(CASE WHEN p.mode = 'radius'
+                        THEN ST_Distance(i.public_geom::geography, p.center_geom::geography) END),
+               i.created_at
+        FROM alert_preferences p
+        JOIN incidents i
+          ON (p.mode = 'radius' AND ST_Intersects(p.area, i.public_geom)
+              AND ST_DWithin(i.public_geom::geography, p.center_geom::geography, p.radius_km * 1000))
+          OR (p.mode = 'neighborhood' AND p.neighborhood_id = i.neighborhood_id)
+        WHERE p.enabled AND i.status = 'open' AND i.user_id <> p.user_id
+          AND i.created_at >= now() - interval '3 days'
+          AND (p.types IS NULL OR i.type = ANY(p.types))
+          AND CASE i.severity WHEN 'alta' THEN 3 WHEN 'media' THEN 2 ELSE 1 END
+              >= CASE p.min_severity WHEN 'alta' THEN 3 WHEN 'media' THEN 2 ELSE 1 END
+        GROUP BY p.user_id, i.id, i.created_at
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_alert_inbox_unread', table_name='alert_inbox', postgresql_where=sa.text('read_at IS NULL AND NOT stale'))
+    op.drop_index('idx_alert_inbox_user_created', table_name='alert_inbox')
+    op.drop_table('alert_inbox')
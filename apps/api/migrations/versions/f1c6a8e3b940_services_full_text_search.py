@@ -0,0 +1,55 @@
+"""services_full_text_search
+
+Revision ID: f1c6a8e3b940
+Revises: e4b7d2a9c815
+Create Date: 2026-10-19 14:55:06.731290
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'f1c6a8e3b940'
+down_revision: Union[str, None] = 'e4b7d2a9c815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Portuguese stemming on unaccented words, so "eletricista" matches "eletricistas"
+    # and "acougue" matches "açougue"
+    op.execute("CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese)")
+    op.execute(
+        "ALTER TEXT SEARCH CONFIGURATION pt_unaccent "
+        "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem"
+    )
+    # unaccent() is only STABLE; an IMMUTABLE wrapper with a fixed dictionary can be indexed
+    op.execute(
+        "CREATE FUNCTION f_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS "
+        "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    )
+
+    op.execute(
+        "ALTER TABLE services ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('pt_unaccent', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('pt_unaccent', coalesce(category, '')), 'B') || "
+        "setweight(to_tsvector('pt_unaccent', coalesce(description, '')), 'C')"
+        ") STORED"
+    )
+    op.create_index('idx_services_search_vector', 'services', ['search_vector'], unique=False, postgresql_using='gin')
+    op.execute(
+        "CREATE INDEX idx_services_name_trgm ON services "
+        "USING gin (f_unaccent(lower(name)) gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_services_name_trgm', table_name='services')
+    op.drop_index('idx_services_search_vector', table_name='services', postgresql_using='gin')
+    op.drop_column('services', 'search_vector')
+    op.execute("DROP FUNCTION f_unaccent(text)")
+    op.execute("DROP TEXT SEARCH CONFIGURATION pt_unaccent")
@@ -0,0 +1,107 @@
+"""Micro-benchmark: route/incident exposure, pure Python vs NumPy.
+
+Compares the previous scoring path (per-incident, per-vertex haversine checks
+in Python, as ``_haversine_km`` is used in the routes module) and a pure-Python
+point-to-segment loop against ``app.core.corridor.polyline_exposure``.
+The SQL path (``_incidents_near_line``) is not timed here: it adds a database
+round trip per call, typically a few milliseconds, on top of the figures below.
+
+Usage (from apps/api):
+    python -m scripts.bench_corridor [--points 1500] [--incidents 200] [--routes 3]
+"""
+
+import argparse
+import math
+import random
+import timeit
+
+import numpy as np
+
+from app.core.corridor import polyline_exposure
+
+BUFFER_M = 200
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    R = 6371.0
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def python_vertex_haversine(route: list[list[float]], incidents: list[tuple[float, float]]) -> list[bool]:
+    """Incident is exposed if any route vertex is within the buffer."""
+    limit_km = BUFFER_M / 1000
+    return [
+        any(_haversine_km(lat, lon, vlat, vlon) <= limit_km for vlon, vlat in route)
+        for lon, lat in incidents
+    ]
+
+
+def python_segments(route: list[list[float]], incidents: list[tuple[float, float]]) -> list[bool]:
+    """Exact point-to-segment distance on a local projection, in plain Python."""
+    kx = 111_320 * math.cos(math.radians(sum(c[1] for c in route) / len(route)))
+    ky = 110_540
+    pts = [(lon * kx, lat * ky) for lon, lat in route]
+    out = []
+    for lon, lat in incidents:
+        px, py = lon * kx, lat * ky
+        best = math.inf
+        for (ax, ay), (bx, by) in zip(pts, pts[1:]):
+            dx, dy = bx - ax, by - ay
+            seg_len2 = dx * dx + dy * dy
+            t = 0.0 if seg_len2 == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg_len2))
+            best = min(best, math.hypot(px - (ax + t * dx), py - (ay + t * dy)))
+        out.append(best <= BUFFER_M)
+    return out
+
+
+def _random_route(n: int, rng: random.Random) -> list[list[float]]:
+    lon, lat = -43.20, -22.90
+    route = []
+    for _ in range(n):
+        lon += rng.uniform(-0.0002, 0.0006)
+        lat += rng.uniform(-0.0002, 0.0004)
+        route.append([lon, lat])
+    return route
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=1500, help="vertices per route")
+    parser.add_argument("--incidents", type=int, default=200, help="candidate incidents")
+    parser.add_argument("--routes", type=int, default=3, help="alternatives to score")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    routes = [_random_route(args.points, rng) for _ in range(args.routes)]
+    lons = [c[0] for r in routes for c in r]
+    lats = [c[1] for r in routes for c in r]
+    incidents = [
+        (rng.uniform(min(lons), max(lons)), rng.uniform(min(lats), max(lats)))
+        for _ in range(args.incidents)
+    ]
+    inc_array = np.array(incidents)
+    route_arrays = [np.array(r) for r in routes]
+
+    expected = [python_segments(r, incidents) for r in routes]
+    got = [polyline_exposure(r, inc_array, BUFFER_M)[0].tolist() for r in route_arrays]
+    assert expected == got, "NumPy and pure-Python results differ"
+
+    cases = {
+        "python vertex haversine": lambda: [python_vertex_haversine(r, incidents) for r in routes],
+        "python point-to-segment": lambda: [python_segments(r, incidents) for r in routes],
+        "numpy polyline_exposure": lambda: [polyline_exposure(r, inc_array, BUFFER_M) for r in route_arrays],
+    }
+
+    print(f"{args.routes} routes x {args.points} vertices, {args.incidents} incidents")
+    for name, fn in cases.items():
+        number = 1 if name.startswith("python") else 20
+        best = min(timeit.repeat(fn, number=number, repeat=args.repeat)) / number
+        print(f"  {name:<26} {best * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Load neighborhood polygons and assign existing incidents to them.
+
+Accepts a GeoJSON FeatureCollection (EPSG:4326). Shapefiles and other
+OGR formats are converted on the fly with ``ogr2ogr`` (GDAL must be
+installed). Rows are upserted by (city, name), so re-running with an updated
+file replaces the boundaries.
+
+Usage (from apps/api):
+    python -m scripts.load_neighborhoods bairros.geojson --city "Rio de Janeiro" [--name-field NOME] [--reassign]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+
+_UPSERT_SQL = text(
+    """
+    INSERT INTO neighborhoods (name, city, geom)
+    VALUES (
+        :name, :city,
+        ST_Multi(ST_CollectionExtract(ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(:geometry), 4326)), 3))
+    )
+    ON CONFLICT (city, name) DO UPDATE SET geom = EXCLUDED.geom
+    """
+)
+
+_ASSIGN_INCIDENTS_SQL = """
+    UPDATE incidents i SET neighborhood_id = n.id
+    FROM neighborhoods n
+    WHERE ST_Covers(n.geom, i.geom) {only_missing}
+"""
+
+_ASSIGN_PREFERENCES_SQL = text(
+    """
+    UPDATE alert_preferences p SET neighborhood_id = n.id
+    FROM neighborhoods n
+    WHERE p.mode = 'neighborhood' AND p.neighborhood_id IS NULL
+      AND lower(n.name) = lower(p.neighborhood_name)
+    """
+)
+
+
+def _read_features(path: Path) -> list[dict]:
+    if path.suffix.lower() in (".geojson", ".json"):
+        data = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        try:
+            out = subprocess.run(
+                ["ogr2ogr", "-f", "GeoJSON", "-t_srs", "EPSG:4326", "/vsistdout/", str(path)],
+                check=True,
+                capture_output=True,
+            )
+        except FileNotFoundError:
+            sys.exit("ogr2ogr not found: install GDAL or convert the file to GeoJSON first")
+        data = json.loads(out.stdout)
+    if data.get("type") != "FeatureCollection":
+        sys.exit("Expected a GeoJSON FeatureCollection")
+    return data["features"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=Path, help="GeoJSON, shapefile or any OGR-readable file")
+    parser.add_argument("--city", default="", help="city the neighborhoods belong to")
+    parser.add_argument("--name-field", default="name", help="feature property holding the neighborhood name")
+    parser.add_argument("--reassign", action="store_true", help="recompute neighborhood_id for all incidents")
+    args = parser.parse_args()
+
+    rows = []
+    for feature in _read_features(args.path):
+        name = (feature.get("properties") or {}).get(args.name_field)
+        geometry = feature.get("geometry")
+        if not name or not geometry or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            continue
+        rows.append({"name": str(name).strip(), "city": args.city, "geometry": json.dumps(geometry)})
+    if not rows:
+        sys.exit(f"No polygon features with a '{args.name_field}' property found")
+
+    engine = create_engine(settings.DATABASE_URL_SYNC)
+    with engine.begin() as conn:
+        conn.execute(_UPSERT_SQL, rows)
+        only_missing = "" if args.reassign else "AND i.neighborhood_id IS NULL"
+        incidents = conn.execute(text(_ASSIGN_INCIDENTS_SQL.format(only_missing=only_missing))).rowcount
+        prefs = conn.execute(_ASSIGN_PREFERENCES_SQL).rowcount
+    engine.dispose()
+
+    print(f"Loaded {len(rows)} neighborhoods; assigned {incidents} incidents and {prefs} alert preferences")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ export interface AlertPreference {
   user_id: number;
   mode: string;
   neighborhood_name: string | null;
+  neighborhood_id: number | null;
   center_lat: number | null;
   center_lon: number | null;
   radius_km: number | null;
@@ -20,13 +21,17 @@ export interface AlertFeedItem {
   description: string | null;
   lat: number;
   lon: number;
-  distance_km: number;
+  distance_km: number | null;
+  neighborhood_id: number | null;
   created_at: string;
+  read: boolean;
+  stale: boolean;
 }
 
 export interface CreateAlertPreference {
   mode: string;
   neighborhood_name?: string;
+  neighborhood_id?: number;
   center_lat?: number;
   center_lon?: number;
   radius_km?: number;
@@ -54,6 +59,14 @@ export const alertsApi = {
   getAlertFeed: () =>
     apiClient.get<AlertFeedItem[]>("/alerts/feed").then((r) => r.data),
 
+  getUnreadCount: () =>
+    apiClient.get<{ unread: number }>("/alerts/feed/unread-count").then((r) => r.data),
+
+  markRead: (incidentIds?: number[]) =>
+    apiClient
+      .post<{ unread: number }>("/alerts/feed/read", { incident_ids: incidentIds ?? null })
+      .then((r) => r.data),
+
   previewIncidents: (lat: number, lon: number, radiusKm: number, types?: string[], minSeverity?: string) => {
     const params: Record<string, string | number> = { lat, lon, radius_km: radiusKm };
     if (types && types.length > 0) params.types = types.join(",");
@@ -20,10 +20,17 @@ export interface CustomRouteBody {
   profile: string;
 }
 
+// Compact encoded geometry: much smaller payloads and faster to parse than GeoJSON
+const GEOMETRY_FORMAT = "polyline6";
+
 export const routesApi = {
   getCommuteRoute: (profile: string = "driving-car") =>
-    apiClient.post<RouteAlternative>("/routes/commute", { profile }).then((r) => r.data),
+    apiClient
+      .post<RouteAlternative>("/routes/commute", { profile, geometry_format: GEOMETRY_FORMAT })
+      .then((r) => r.data),
 
   getCustomRoute: (body: CustomRouteBody) =>
-    apiClient.post<RouteAlternative>("/routes/custom", body).then((r) => r.data),
+    apiClient
+      .post<RouteAlternative>("/routes/custom", { ...body, geometry_format: GEOMETRY_FORMAT })
+      .then((r) => r.data),
 };
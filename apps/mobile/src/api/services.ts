@@ -15,11 +15,12 @@ export interface ServiceResponse {
   status: string;
   plan_level: string;
   created_at: string;
+  distance_m?: number | null;
 }
 
 export interface ServiceListResponse {
   services: ServiceResponse[];
-  total: number;
+  total: number | null;
 }
 
 export interface ServiceLimits {
@@ -41,13 +42,45 @@ export interface CreateServiceBody {
   images?: string[];
 }
 
+interface DirectoryQuery {
+  lat: number;
+  lon: number;
+  radiusM?: number;
+  category?: string;
+  search?: string;
+  sort?: "nearest";
+  limit?: number;
+}
+
+/**
+ * Build the directory query the way the API canonicalises it (snapped
+ * coordinates and radius, fixed parameter order, defaults omitted), so
+ * requests hit the shared cache directly instead of following a redirect.
+ */
+function directoryPath(q: DirectoryQuery): string {
+  const parts: [string, string][] = [
+    ["lat", q.lat.toFixed(3)],
+    ["lon", q.lon.toFixed(3)],
+  ];
+  if (q.radiusM != null) parts.push(["radius_m", String(Math.min(Math.ceil(q.radiusM / 250) * 250, 50000))]);
+  if (q.category) parts.push(["category", q.category]);
+  const search = q.search?.toLowerCase().split(/\s+/).filter(Boolean).join(" ");
+  if (search) parts.push(["search", search]);
+  if (q.sort) parts.push(["sort", q.sort]);
+  if (q.limit != null && q.limit !== 50) parts.push(["limit", String(q.limit)]);
+  return "/services?" + parts.map(([k, v]) => `${k}=${encodeURIComponent(v)}`).join("&");
+}
+
 export const servicesApi = {
-  listServices: (lat: number, lon: number, radiusM: number = 2000, category?: string, search?: string) => {
-    const params: Record<string, string | number> = { lat, lon, radius_m: radiusM };
-    if (category) params.category = category;
-    if (search) params.search = search;
-    return apiClient.get<ServiceListResponse>("/services", { params }).then((r) => r.data);
-  },
+  listServices: (lat: number, lon: number, radiusM: number = 2000, category?: string, search?: string) =>
+    apiClient
+      .get<ServiceListResponse>(directoryPath({ lat, lon, radiusM, category, search }))
+      .then((r) => r.data),
+
+  listNearestServices: (lat: number, lon: number, limit: number = 20, category?: string, search?: string) =>
+    apiClient
+      .get<ServiceListResponse>(directoryPath({ lat, lon, limit, sort: "nearest", category, search }))
+      .then((r) => r.data),
 
   getService: (id: number) =>
     apiClient.get<ServiceResponse>(`/services/${id}`).then((r) => r.data),
@@ -11,8 +11,8 @@ interface RouteOverlayProps {
   isSelected?: boolean;
 }
 
-// Decode Google Encoded Polyline (used by OpenRouteService)
-function decodePolyline(encoded: string): [number, number][] {
+// Decode Google Encoded Polyline (the API sends precision 6 via geometry_format=polyline6)
+function decodePolyline(encoded: string, factor = 1e6): [number, number][] {
   const coords: [number, number][] = [];
   let index = 0;
   let lat = 0;
@@ -45,7 +45,7 @@ function decodePolyline(encoded: string): [number, number][] {
     lng += dlng;
 
     // GeoJSON uses [longitude, latitude]
-    coords.push([lng / 1e5, lat / 1e5]);
+    coords.push([lng / factor, lat / factor]);
   }
 
   return coords;